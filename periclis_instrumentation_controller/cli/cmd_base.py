@@ -60,6 +60,7 @@ class CMDBase(cmd.Cmd):
         self.available_controllers = AVAILABLE_CONTROLLERS
 
         self.connection_succeded = False #Connection with controller.
+        self.connections = {} #Resource, controller and alias of each connected namespace (prompt of the active one).
         #Completes Controllers automatically with TAB:
         self.autocompleter = CMDAutocompletion()
         self.autocomplete_commands = [command['descr'] for command in CMD_LIST]    
@@ -111,52 +112,80 @@ class CMDBase(cmd.Cmd):
     def do_connect_resource(self, args):
         self.alias_use = False #Variable that inidicates use of alias.
         (args, self.alias_use, self.alias_name) = self.resource_connector.check_controller_aliases(args, read_file(ALIAS_PATH, '.json'), self.alias_use)
-        if self.connected_resource_name != NOT_CONNECTED:
-            self.do_disconnect()
-            print_red("Disconnected from the current controller!")
 
         self.connection_succeded = False
 
         try:
             controller = self.available_controllers[args[1]] 
+            namespace = self.alias_name if self.alias_use else None #Services of the controller are also called as namespace.service (alias or controller name).
 
             if self.alias_use: #With alias the resource is already in the argument.
                 resourceLabel = args[0]
-                self.connection_succeded = self.resource_manager.connect_controller(controller, resourceLabel)
+                self.connection_succeded = self.resource_manager.connect_controller(controller, resourceLabel, namespace)
             else:
                 if int(args[0]) == -1: # if we receive a value of -1 to the resource we connect without.
-                    self.connection_succeded = self.resource_manager.connect_controller(controller)
+                    self.connection_succeded = self.resource_manager.connect_controller(controller, namespace=namespace)
                 else: #Without alias, it will be needed to find the resource.               
                     resourceLabel = self.resource_connector.available_resources[int(args[0])]            
-                    self.connection_succeded = self.resource_manager.connect_controller(controller, resourceLabel)
+                    self.connection_succeded = self.resource_manager.connect_controller(controller, resourceLabel, namespace)
     
         except Exception as error:
             print(f"Something went wrong in the Controller/Resource Parsing: {error}")
 
         if self.connection_succeded:
-            self.service_manager.insert_controller_services(self.resource_manager) 
-            
-
-            set_cmd_config(self, args[0], controller, 
-                           connected_to_resource=True, alias_use = self.alias_use, alias_name = self.alias_name)
+            self.connections[self.resource_manager.active_namespace] = {'resource_name': args[0], 'current_controller': controller,
+                                                                        'alias_use': self.alias_use, 'alias_name': self.alias_name}
+            self.activate_controller()
 
             print_blue("\nConnection Succeded!") 
+            print_blue(f"Services of this controller can be called as {self.resource_manager.active_namespace}.service_name while other controllers are active.")
             self.do_services_list()
 
         else:
+            self.activate_controller() #A previous controller of the same namespace may have been disconnected.
             print_red("\tCould not connect to Device ;-;")
+
+    def activate_controller(self): #Services (without namespace) and prompt of the active controller.
+        if self.connected_resource_name != NOT_CONNECTED:
+            self.service_manager.delete_services_method()
+        self.connections = {namespace: connection for (namespace, connection) in self.connections.items() if namespace in self.resource_manager.controllers}
+        if self.resource_manager.active_namespace is None:
+            set_cmd_config_to_default(self)
+            return
+        self.service_manager.insert_controller_services(self.resource_manager) 
+        set_cmd_config(self, connected_to_resource=True, **self.connections[self.resource_manager.active_namespace])
+
+    def namespace_service(self, command: str): #Service called as namespace.service, of any connected controller (active or not).
+        (namespace, _, service) = command.partition('.')
+        controller = self.resource_manager.controller(namespace)
+        if service not in controller.list_services():
+            raise Exception(f"Service {service} not available in {namespace}. Check the services with: use_controller {namespace} and services_list.")
+        return getattr(controller, service)
+
+    def do_use_controller(self, args=None): #Makes a connected controller the active one (services without namespace).
+        namespace = first_list_argument(args)
+        self.resource_manager.use_controller(str(namespace))
+        self.activate_controller()
+        print_blue(f"Active controller: {namespace}.")
+
+    def do_connected_controllers(self, args=None):
+        if not self.resource_manager.controllers:
+            print_red("\nNot Connected to a Resource\n")
+        for namespace in self.resource_manager.controllers:
+            active = " (active)" if namespace == self.resource_manager.active_namespace else ""
+            print(f"{get_blue(namespace)}: {get_green(self.connections[namespace]['current_controller'].__name__)} - {self.resource_manager.resource_labels[namespace]}{active}")
             
-    def do_disconnect(self, args=None):
+    def do_disconnect(self, args=None): #Disconnects the active controller, or the one of the namespace given.
         if self.connected_resource_name == NOT_CONNECTED:
             print_red("\nNot Connected to a Resource\n")
         else:
-            self.resource_manager.disconnect_resource()
-            self.service_manager.delete_services_method()
+            self.resource_manager.disconnect_resource(None if args is None else str(first_list_argument(args)))
 
-        set_cmd_config_to_default(self)
+        self.activate_controller()
 
     
     def do_eof(self, args=None): #Allows the use of sequences on .txt files (scripts folder).
+        self.resource_manager.close() #Closes the sessions kept open by the pool.
         return True
 
     def do_alias(self, args=None):
@@ -189,6 +218,7 @@ class CMDBase(cmd.Cmd):
     
     def do_quit(self, arg=None): #Finish program execution.        
         print_red("\nQuitting...\n")
+        self.resource_manager.close() #Closes the sessions kept open by the pool.
         return True  # Returning True exits the command loop   
     
 #periclis < ./scripts/test.txt
\ No newline at end of file
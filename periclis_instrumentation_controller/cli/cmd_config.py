@@ -37,13 +37,15 @@ CMD_LIST = [{'descr': 'alias', 'args': 'alias controller_name resource_id (resou
             {'descr': 'alias_delete', 'args': 'alias'},
             {'descr': 'alias_list'},    
             {'descr': 'connect_resource', 'args': 'ResourceId ControllerName'},
+            {'descr': 'connected_controllers'},
             {'descr': 'delay', 'args': 'delay_time (seconds)'},
-            {'descr': 'disconnect'},
+            {'descr': 'disconnect', 'args': 'namespace (optional, active controller by default)'},
             {'descr': 'find_resources'},
             {'descr': 'list_commands'},
             {'descr': 'present_controllers'}, 
             {'descr': 'quit'},
-            {'descr': 'services_list'}
+            {'descr': 'services_list'},
+            {'descr': 'use_controller', 'args': 'namespace'}
             ]
     
 def set_cmd_config_to_default(cmd : "CMDBase"):
@@ -15,35 +15,127 @@
 # @date 24/04/2024
 ###############################################################################
 
+import time
 import logging 
 import pyvisa as visa
+from periclis_instrumentation_controller.utils.instrument_worker import WorkerSession
 
 BYPASS_LABEL = 'BYPASS'
+SESSION_IDLE_TIMEOUT = 600 #Seconds a released session stays open waiting for the next connection to its resource.
+
+def controller_namespace(controllerClass) -> str: #Default namespace of the services of a controller: scope_controller -> scope.
+    return controllerClass.__name__.removesuffix('_controller')
+
+## Session pool: the VISA backend is initialized once, and the session of each resource is kept open (warm) across controller switches
 
 class PeriCLIsResourceManager(visa.ResourceManager):
+    idle_timeout = SESSION_IDLE_TIMEOUT
+
     def __init__(self) -> None:
         super().__init__()
+        if hasattr(self, 'sessions'): #pyvisa returns the manager already open for the VISA library: its pool is kept.
+            return
+        self.sessions = {} #Open session of each resource name.
+        self.released = {} #Time each session not used by a controller was released.
+        self.probes = {} #Answers of the capability probes (*IDN?, *OPT?...) of each resource, kept while its session is open.
+        self.capabilities = {} #Capabilities found by the controllers of each resource (e.g. FastFrame support), kept while its session is open.
+        self.controllers = {} #Connected controller of each namespace (alias or controller name), all usable at the same time.
+        self.resource_labels = {} #Resource of each namespace.
+        self.active_namespace = None
+
+    def open_session(self, resource_name: str): #Session already open for the resource, or a new one.
+        self.close_idle_sessions()
+        session = self.sessions.get(resource_name)
+        if session is None:
+            session = WorkerSession(self.open_resource(resource_name)) #Calls of the session run on a worker thread of the instrument.
+            self.sessions[resource_name] = session
+        self.released.pop(resource_name, None)
+        return session
+
+    def release_session(self, resource_name: str): #Session kept open for the next connection, until it is idle for idle_timeout seconds.
+        if resource_name in self.sessions and resource_name not in self.resource_labels.values(): #Not released while another namespace uses the resource.
+            self.released[resource_name] = time.monotonic()
+
+    def close_idle_sessions(self):
+        now = time.monotonic()
+        for resource_name, released in list(self.released.items()):
+            if now - released >= self.idle_timeout:
+                self.close_session(resource_name)
+
+    def close_session(self, resource_name: str): #Closes the session and ends its worker thread.
+        session = self.sessions.pop(resource_name, None)
+        self.released.pop(resource_name, None)
+        self.probes.pop(resource_name, None)
+        self.capabilities.pop(resource_name, None)
+        if session is not None:
+            try:
+                session.close()
+            except Exception as error:
+                logging.warning(f"Session of {resource_name} not closed: {error}")
+
+    def probe(self, resource_name: str, query: str) -> str: #Answer of a capability query, asked to the instrument only once per session.
+        answers = self.probes.setdefault(resource_name, {})
+        if query not in answers:
+            answers[query] = self.sessions[resource_name].query(query)
+        return answers[query]
+
+    def resource_capabilities(self, resource_name: str) -> dict:
+        return self.capabilities.setdefault(resource_name, {})
+
+    def close(self): #Disconnects every controller, closes every session of the pool and the VISA backend.
+        for namespace in list(self.controllers):
+            self.disconnect_resource(namespace)
+        for resource_name in list(self.sessions):
+            self.close_session(resource_name)
+        super().close()
     
-    def connect_controller(self, controllerClass, resourceLabel=BYPASS_LABEL):
+    def connect_controller(self, controllerClass, resourceLabel=BYPASS_LABEL, namespace=None):
+        namespace = namespace or controller_namespace(controllerClass)
+        if namespace in self.controllers: #The namespace is reused by the new connection.
+            self.disconnect_resource(namespace)
         try:
             # This bypass if you want to connect without 
             # using a resource 
             if resourceLabel == BYPASS_LABEL:
-                self.current_controller = controllerClass()
+                controller = controllerClass()
             else:
-                self.current_controller = controllerClass(resourceLabel)
+                controller = controllerClass(resourceLabel, resource_manager=self)
 
         except Exception as error:
             logging.exception(f"Not Able To Connect: {error}")
+            if resourceLabel != BYPASS_LABEL and resourceLabel not in self.resource_labels.values():
+                self.close_session(resourceLabel) #The next connection opens a new session (the instrument may have been reset or unplugged).
             raise
 
+        self.controllers[namespace] = controller
+        self.resource_labels[namespace] = resourceLabel
+        self.active_namespace = namespace
         return True    
 
-    def list_services(self) -> dict:
+    @property
+    def current_controller(self): #Controller of the active namespace (services called without namespace).
+        return self.controllers.get(self.active_namespace)
+
+    def controller(self, namespace: str):
+        if namespace not in self.controllers:
+            raise Exception(f"No controller connected as {namespace}. Connected controllers: {list(self.controllers)}.")
+        return self.controllers[namespace]
+
+    def use_controller(self, namespace: str): #Makes the controller of the namespace the active one.
+        self.controller(namespace)
+        self.active_namespace = namespace
+
+    def list_services(self, namespace=None) -> dict:
         try:
-            return self.current_controller.list_services()
+            return self.controller(namespace or self.active_namespace).list_services()
         except:
             logging.exception("No Current Controller")
 
-    def disconnect_resource(self):
-        self.current_controller.disconnect()
+    def disconnect_resource(self, namespace=None): #Disconnects the controller of the namespace (the active one by default).
+        namespace = namespace or self.active_namespace
+        controller = self.controller(namespace)
+        del self.controllers[namespace]
+        del self.resource_labels[namespace]
+        controller.disconnect()
+        if namespace == self.active_namespace: #The last connected controller left becomes the active one.
+            self.active_namespace = next(reversed(self.controllers), None)
@@ -0,0 +1,69 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file capture_averaging.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import time
+import numpy as np # http://www.numpy.org
+
+from periclis_instrumentation_controller.utils.color_handling import *
+from periclis_instrumentation_controller.scope_control.scope_capture import ScopeCapture
+from periclis_instrumentation_controller.scope_control.device_specific_commands import ACCEPTED_AVERAGING_MODES
+
+# Running mean and min/max envelope of captures, updated in place: the memory is a few (channels, points) buffers whatever the number of captures.
+class CaptureAccumulator():
+    def __init__(self, n_channels: int, n_points: int, mode: str, weight: int) -> None:
+        self.mode = mode
+        self.weight = int(weight) #Exponential mode: the new capture weighs 1/weight.
+        self.mean = np.zeros((n_channels, n_points), dtype='double')
+        self.minimum = np.full((n_channels, n_points), np.inf) if mode == ACCEPTED_AVERAGING_MODES.envelope else None #Envelope buffers only in envelope mode.
+        self.maximum = np.full((n_channels, n_points), -np.inf) if mode == ACCEPTED_AVERAGING_MODES.envelope else None
+        self.difference = np.empty((n_channels, n_points), dtype='double')
+        self.count = 0
+
+    def add(self, waves): #mean += (waves - mean) / n, with n = captures (mean) or min(captures, weight) (exponential).
+        self.count += 1
+        weight = min(self.count, self.weight) if self.mode == ACCEPTED_AVERAGING_MODES.exponential else self.count
+        np.subtract(waves, self.mean, out=self.difference)
+        self.difference *= 1 / weight
+        self.mean += self.difference
+        if self.minimum is not None:
+            np.minimum(self.minimum, waves, out=self.minimum)
+            np.maximum(self.maximum, waves, out=self.maximum)
+
+    def envelope(self):
+        return (self.minimum, self.maximum) if self.minimum is not None else None
+
+# Software averaging of repeated captures. The result is a capture without codes (the averaged volts are saved as they are, with the preambles of the captures) stored and plotted as any other capture.
+class capture_averaging():
+    def averaging_manager(self, captures: int):
+        channels = [int(self.channel_std_trigger)] + self.new_channels
+        accumulator = None
+        start = time.monotonic()
+        try:
+            for (waves, timebase) in self.repeated_waves(channels, captures):
+                if accumulator is None:
+                    accumulator = CaptureAccumulator(len(channels), timebase.n, self.averaging_mode, int(self.averaging_count))
+                accumulator.add(waves)
+        except KeyboardInterrupt:
+            print_yellow("\nAveraging interrupted by the user.")
+        if accumulator is None:
+            print_red("No capture to average!")
+            return
+        print_green(f"{self.averaging_mode} of {accumulator.count} captures of channels {channels} ({self.repeated_missed} missed) in {time.monotonic()-start:.2f} s.")
+        self.capture = ScopeCapture(accumulator.mean, channels, self.repeated_preambles, None, timebase, self.trigger_current_threshold, True, time.time(),
+                                    accumulator.envelope(), accumulator.count)
+        (self.wave_lower_limit, self.wave_upper_limit) = self.capture.limits()
+        self.store_data()
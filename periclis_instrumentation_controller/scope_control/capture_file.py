@@ -0,0 +1,106 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file capture_file.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import json
+import numpy as np # http://www.numpy.org
+from pathlib import Path
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+
+CAPTURE_PREAMBLE_FIELDS = ('nr_pt', 'pt_off', 'xincr', 'xzero', 'ymult', 'yoff', 'yzero') #Preamble values needed to rebuild time and volts from the codes.
+
+## Binary captures: raw curve? codes of every channel + preamble + metadata in a single .npz file
+
+def save_capture_file(file_path, channels: list, codes, preambles: list, trigger_level: float, metadata: dict, timestamps=None, envelope=None, volts=None):
+    #codes: one array of codes per channel (channels, points), or (segments, channels, points) for segmented captures (timestamps: one per segment). envelope: (minimum, maximum) volts of averaged captures.
+    #volts: (channels, points) volts of averaged captures, saved instead of the codes (codes None). The preambles are still saved for the time.
+    arrays = {f"preamble_{field}": np.array([getattr(preamble, field) for preamble in preambles], dtype='double') for field in CAPTURE_PREAMBLE_FIELDS}
+    if timestamps is not None:
+        arrays['timestamps'] = np.asarray(timestamps, dtype='double')
+    if envelope is not None:
+        (arrays['envelope_minimum'], arrays['envelope_maximum']) = envelope
+    if volts is not None:
+        arrays['volts'] = np.asarray(volts, dtype='double')
+    else:
+        arrays['codes'] = np.asarray(codes)
+    np.savez(file_path, channels=np.array(channels, dtype=int), trigger_level=np.array(trigger_level, dtype='double'),
+             metadata=np.array(json.dumps(metadata)), **arrays)
+
+class CaptureFile(): #Loads a .npz capture. The codes are only read, and the volts/time only computed, when they are used.
+    def __init__(self, file_path) -> None:
+        self.file_path = Path(file_path)
+        self.archive = np.load(self.file_path)
+        self.channels = [int(channel) for channel in self.archive['channels']]
+        self.trigger_level = float(self.archive['trigger_level'])
+        self.metadata = json.loads(str(self.archive['metadata']))
+        self.preamble = {field: self.archive[f"preamble_{field}"] for field in CAPTURE_PREAMBLE_FIELDS}
+        self.timestamps = self.archive['timestamps'] if 'timestamps' in self.archive.files else None #Time (s since epoch) of each segment.
+        self.envelope = (self.archive['envelope_minimum'], self.archive['envelope_maximum']) if 'envelope_minimum' in self.archive.files else None
+        self.averaged = 'volts' in self.archive.files #Averaged capture: volts saved instead of codes.
+        self._codes = None
+        self._volts = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.archive.close()
+
+    def channel_index(self, channel: int):
+        if int(channel) not in self.channels:
+            raise Exception(f"Channel {channel} is not saved in {self.file_path}. Saved channels: {self.channels}.")
+        return self.channels.index(int(channel))
+
+    @property
+    def codes(self):
+        if self.averaged:
+            raise Exception(f"{self.file_path} is an averaged capture: it has volts, not codes.")
+        if self._codes is None:
+            self._codes = self.archive['codes']
+        return self._codes
+
+    def volts(self, channel: int): #Volts of the channel (every segment, if the capture is segmented).
+        if int(channel) not in self._volts:
+            index = self.channel_index(channel)
+            if self.averaged:
+                self._volts[int(channel)] = self.archive['volts'][index]
+            else:
+                self._volts[int(channel)] = (self.codes[..., index, :] - self.preamble['yoff'][index]) * self.preamble['ymult'][index] + self.preamble['yzero'][index]
+        return self._volts[int(channel)]
+
+    def waves(self): #Volts of every channel, shaped (channels, points) or (segments, channels, points).
+        if self.averaged:
+            return self.archive['volts']
+        return (self.codes - self.preamble['yoff'][:, np.newaxis]) * self.preamble['ymult'][:, np.newaxis] + self.preamble['yzero'][:, np.newaxis]
+
+    def time(self, channel: int = None) -> Timebase: #Timebase (seconds, relative to the trigger) of the points.
+        index = 0 if channel is None else self.channel_index(channel)
+        xincr = self.preamble['xincr'][index]
+        return Timebase(-self.preamble['pt_off'][index] * xincr + self.preamble['xzero'][index], xincr, self.waves().shape[-1] if self.averaged else self.codes.shape[-1])
+
+def load_capture_file(file_path) -> CaptureFile:
+    return CaptureFile(file_path)
+
+def find_capture_file(file_name: str, directory: Path) -> Path: #File of the directory with the name (with or without extension), ignoring the case (the CLI lowercases the arguments).
+    name = str(file_name).lower()
+    files = sorted(directory.glob('*.npz'))
+    for file_path in files:
+        if name in (file_path.name.lower(), file_path.stem.lower()):
+            return file_path
+    raise Exception(f"Capture file {file_name} not found in {directory}. Available files: {[file_path.name for file_path in files]}.")
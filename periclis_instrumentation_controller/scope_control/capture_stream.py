@@ -0,0 +1,203 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file capture_stream.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import time
+import threading
+import numpy as np # http://www.numpy.org
+from pathlib import Path
+
+from periclis_instrumentation_controller.utils.color_handling import *
+from periclis_instrumentation_controller.scope_control.controller_config import *
+from periclis_instrumentation_controller.scope_control.curve_transfer import query_channel_codes, codes_datatype, scale_codes
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+from periclis_instrumentation_controller.scope_control.capture_file import save_capture_file
+from periclis_instrumentation_controller.scope_control.device_specific_commands import WRITE_COMMANDS, QUERY_COMMANDS, WRITE_ACQUISITION, READ_ACQUISITION
+
+STREAM_REPORT_INTERVAL = 2 #Seconds between two prints of the streaming rates.
+STREAM_FLUSH_INTERVAL = 1 #Maximum seconds that captures wait on the ring buffer before being written (even if the batch is not complete).
+
+# Fixed size buffer of raw codes shared by the acquisition (producer) and the disk writer (consumer).
+class CaptureRingBuffer():
+    def __init__(self, slots: int, n_channels: int, n_points: int, datatype) -> None:
+        self.codes = np.empty((slots, n_channels, n_points), dtype=datatype)
+        self.timestamps = np.empty(slots, dtype='double')
+        self.slots = slots
+        self.head = 0 #Captures stored since the start (the next one goes to head % slots).
+        self.tail = 0 #Captures written to disk since the start.
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, codes: list, timestamp: float): #Copies the codes of a capture to the next slot. Returns False (capture dropped) if the writer is behind and every slot is full.
+        with self.condition:
+            if self.head - self.tail >= self.slots:
+                return False
+        slot = self.codes[self.head % self.slots]
+        for row, channel_codes in zip(slot, codes):
+            row[:] = channel_codes
+        self.timestamps[self.head % self.slots] = timestamp
+        with self.condition:
+            self.head += 1
+            self.condition.notify()
+        return True
+
+    def take(self, batch_size: int): #Waits for a batch (or the flush interval) and returns the first slot and the number of contiguous captures ready to be written.
+        with self.condition:
+            self.condition.wait_for(lambda: self.head - self.tail >= batch_size or self.closed, STREAM_FLUSH_INTERVAL)
+            start = self.tail % self.slots
+            return (start, min(self.head - self.tail, batch_size, self.slots - start))
+
+    def release(self, count: int): #Frees the slots already written.
+        with self.condition:
+            self.tail += count
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def drained(self):
+        with self.condition:
+            return self.closed and self.head == self.tail
+
+# Thread that writes the captures of the ring buffer as batches of .npz files (codes shaped (captures, channels, points)).
+class capture_disk_writer(threading.Thread):
+    def __init__(self, ring: CaptureRingBuffer, file_prefix: str, batch_size: int, channels: list, preambles: list, trigger_level: float, metadata: dict) -> None:
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.file_prefix = file_prefix
+        self.batch_size = batch_size
+        self.channels = channels
+        self.preambles = preambles
+        self.trigger_level = trigger_level
+        self.metadata = metadata
+        self.files_written = 0
+        self.bytes_written = 0
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.ring.drained():
+                (start, count) = self.ring.take(self.batch_size)
+                if count:
+                    codes = self.ring.codes[start:start+count]
+                    save_capture_file(Path(CAPTURE_DATA_DIR/f"{self.file_prefix}_{self.files_written:05d}{CAPTURE_FORMAT}"), self.channels, codes, self.preambles,
+                                      self.trigger_level, self.metadata, self.ring.timestamps[start:start+count])
+                    self.ring.release(count)
+                    self.files_written += 1
+                    self.bytes_written += codes.nbytes
+        except Exception as error: #The acquisition checks it and stops.
+            self.error = error
+
+# Back-to-back captures of raw codes (no scaling, plotting or text files), written to disk by a background thread.
+class capture_stream():
+    def stream_manager(self, captures: int, duration: float): #captures/duration = 0: streams until Ctrl-C.
+        channels = [int(self.channel_std_trigger)] + self.new_channels
+        self.setting_acquisition(self.channel_std_trigger)
+        self.readscale(self.channel_std_trigger)
+        preambles = [self.read_preamble(channel) for channel in channels]
+        datatype = codes_datatype(preambles[0])
+        ring = CaptureRingBuffer(int(self.stream_ring_slots), len(channels), preambles[0].nr_pt, datatype)
+        CAPTURE_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.date_seconds()
+        writer = capture_disk_writer(ring, f"Scope_Stream{self.dt}", int(self.stream_batch_captures), channels, preambles, self.trigger_current_threshold,
+                                     {'timestamp': self.timestamp, 'triggered': True, 'trigger_channel': channels[0]})
+        writer.start()
+        self.stream_statistics = {'captures': 0, 'bytes': 0, 'dropped': 0, 'missed': 0, 'mask_failures': 0}
+        print_blue(f"Streaming channels {channels} to {CAPTURE_DATA_DIR}... Press Ctrl+C to stop.")
+        start = last_report = time.monotonic()
+        try:
+            while (not captures or self.stream_statistics['captures'] + self.stream_statistics['dropped'] < captures) and (not duration or time.monotonic() - start < duration):
+                if writer.error is not None:
+                    raise writer.error
+                self.stream_capture(ring, channels, preambles, datatype)
+                if time.monotonic() - last_report >= STREAM_REPORT_INTERVAL:
+                    self.stream_report(time.monotonic() - start)
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            print_yellow("\nStreaming interrupted by the user.")
+        finally:
+            ring.close()
+            writer.join()
+        self.stream_report(time.monotonic() - start)
+        print_green(f"{writer.files_written} files ({writer.bytes_written/1e6:.1f} MB of codes) saved in {CAPTURE_DATA_DIR} as Scope_Stream{self.dt}_*{CAPTURE_FORMAT}.")
+        if writer.error is not None:
+            raise Exception(f"Error writing the stream files: {writer.error}")
+
+    def stream_capture(self, ring: CaptureRingBuffer, channels: list, preambles: list, datatype): #Re-arms the scope, waits for the capture and stores its codes on the ring buffer (after the inline mask test).
+        self._write(WRITE_COMMANDS.single)
+        if not self.wait_until(self.acquisition_stopped, self.stream_frame_timeout):
+            self.stream_statistics['missed'] += 1
+            return
+        timestamp = time.time()
+        try:
+            codes = self.stream_transfer(channels, datatype)
+        except Exception as error:
+            print_yellow(f"Capture lost ({error}).")
+            self.scope_generator.clear()
+            self.stream_statistics['missed'] += 1
+            return
+        mask_results = self.inline_mask_test(np.asarray(codes), preambles)
+        if mask_results is not None and not mask_results['passed']:
+            self.stream_statistics['mask_failures'] += 1
+        if ring.put(codes, timestamp):
+            self.stream_statistics['captures'] += 1
+            self.stream_statistics['bytes'] += sum(channel_codes.nbytes for channel_codes in codes)
+        else:
+            self.stream_statistics['dropped'] += 1
+
+    def repeated_waves(self, channels: list, captures: int): #Re-arms the scope for each capture and yields its volts (channels, points) and timebase (with the trigger correction of the capture). The volts buffer is overwritten by the next capture.
+        self.setting_acquisition(self.channel_std_trigger)
+        self.readscale(self.channel_std_trigger)
+        preambles = [self.read_preamble(channel) for channel in channels]
+        datatype = codes_datatype(preambles[0])
+        waves = self.scratch_buffer(len(channels), preambles[0].nr_pt)
+        self.repeated_preambles = preambles
+        self.repeated_missed = 0 #Captures not triggered in stream_frame_timeout seconds.
+        for _ in range(captures):
+            self._write(WRITE_COMMANDS.single)
+            if not self.wait_until(self.acquisition_stopped, self.stream_frame_timeout):
+                self.repeated_missed += 1
+                continue
+            preambles = [self.read_preamble(channel) for channel in channels] #Only xzero is read again while the setup is unchanged.
+            timebase = Timebase.from_preamble(preambles[0])
+            self.repeated_preambles = preambles
+            for (row, codes, preamble) in zip(waves, self.stream_transfer(channels, datatype), preambles):
+                scale_codes(codes, preamble, row)
+            yield (waves, timebase)
+
+    def stream_transfer(self, channels: list, datatype): #Codes of every channel, with a single curve? query when the scope accepts it.
+        if len(channels) > 1 and int(self.multi_channel_acquisition) and getattr(self, 'multi_channel_supported', True):
+            try:
+                self._write(WRITE_ACQUISITION.change_acquisition_channel.format(acquisition_channel=READ_ACQUISITION.sources_separator.join('CH'+str(channel) for channel in channels)))
+                return query_channel_codes(self.scope_generator, READ_ACQUISITION.read_curve, len(channels), datatype)
+            except Exception:
+                self.multi_channel_supported = False
+                self.scope_generator.clear()
+        codes = []
+        for channel in channels:
+            self._write(WRITE_ACQUISITION.change_acquisition_channel.format(acquisition_channel=('CH'+str(channel))))
+            codes.append(query_channel_codes(self.scope_generator, READ_ACQUISITION.read_curve, 1, datatype)[0])
+        return codes
+
+    def acquisition_stopped(self): #Single sequence finished (capture ready to be transferred).
+        return int(self._query(QUERY_COMMANDS.read_acquisition_state)) == 0
+
+    def stream_report(self, elapsed: float):
+        statistics = self.stream_statistics
+        print(get_blue("Captures/s:"), get_green(f"{statistics['captures']/elapsed:.2f}"), get_blue("MB/s:"), get_green(f"{statistics['bytes']/elapsed/1e6:.2f}"),
+              get_blue("Captures:"), get_green(str(statistics['captures'])), get_blue("Dropped:"), get_green(str(statistics['dropped'])), get_blue("Missed:"), get_green(str(statistics['missed'])),
+              *((get_blue("Mask failures:"), get_green(str(statistics['mask_failures']))) if getattr(self, 'mask', None) is not None and int(self.mask_inline_test) else ()))
@@ -0,0 +1,69 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file channel_delay.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import time
+import numpy as np # http://www.numpy.org
+
+from periclis_instrumentation_controller.utils.color_handling import *
+
+DELAY_MAX_FRACTION = 0.5 #Largest delay searched, as a fraction of the record (larger lags overlap too few points).
+DELAY_UNITS = {'delay_mean': 's', 'delay_deviation': 's', 'delay_minimum': 's', 'delay_maximum': 's', 'captures': ''}
+
+def correlation_delay(reference, signal, xincr: float): #Delay (s) of signal relative to reference (positive: signal lags), for every pair of waves of arrays shaped (..., points).
+    reference = np.asarray(reference, dtype='double')
+    signal = np.asarray(signal, dtype='double')
+    n_points = reference.shape[-1]
+    n_fft = 1 << int(2*n_points - 1).bit_length() #Zero padding: linear (not circular) correlation, power of 2 length.
+    reference_spectrum = np.fft.rfft(reference - reference.mean(axis=-1, keepdims=True), n_fft, axis=-1)
+    signal_spectrum = np.fft.rfft(signal - signal.mean(axis=-1, keepdims=True), n_fft, axis=-1)
+    correlation = np.fft.irfft(np.conj(reference_spectrum) * signal_spectrum, n_fft, axis=-1)
+    max_lag = int(n_points * DELAY_MAX_FRACTION)
+    lags = np.arange(-max_lag, max_lag+1)
+    correlation = np.concatenate((correlation[..., n_fft-max_lag:], correlation[..., :max_lag+1]), axis=-1)
+    overlap = n_points - np.abs(lags) #Points summed at each lag.
+    peak = np.argmax(correlation, axis=-1)[..., np.newaxis] #Biased correlation: the peak of periodic signals closest to lag 0 is the tallest.
+    neighbours = np.clip(np.concatenate((peak-1, peak, peak+1), axis=-1), 0, lags.size-1)
+    neighbours = np.take_along_axis(correlation, neighbours, axis=-1) / overlap[neighbours] #Only the sub-sample refinement uses the unbiased values.
+    (before, center, after) = (neighbours[..., 0], neighbours[..., 1], neighbours[..., 2])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = 0.5 * (before - after) / (before - 2*center + after) #Vertex of the parabola through the peak and its neighbours.
+    offset = np.where(np.isfinite(offset) & (np.abs(offset) <= 1), offset, 0)
+    return (peak[..., 0] - max_lag + offset) * xincr
+
+def delay_statistics(delays) -> dict:
+    delays = np.asarray(delays, dtype='double').reshape(-1)
+    return {'delay_mean': delays.mean(), 'delay_deviation': delays.std(), 'delay_minimum': delays.min(), 'delay_maximum': delays.max(), 'captures': delays.size}
+
+def delay_histogram(delays, bins: int): #Counts (1, bins) and edges (1, bins+1), in the format of the channel histograms.
+    (counts, edges) = np.histogram(np.asarray(delays).reshape(-1), bins)
+    return (counts[np.newaxis], edges[np.newaxis])
+
+# Delay between two channels over repeated captures (only the delays are kept).
+class channel_delay_measurement():
+    def delay_manager(self, reference_channel: int, channel: int, captures: int):
+        channels = [int(reference_channel), int(channel)]
+        delays = np.empty(captures, dtype='double')
+        measured = 0
+        start = time.monotonic()
+        try:
+            for (waves, timebase) in self.repeated_waves(channels, captures):
+                delays[measured] = correlation_delay(waves[0], waves[1], timebase.xincr)
+                measured += 1
+        except KeyboardInterrupt:
+            print_yellow(f"\nDelay measurement interrupted by the user after {measured} captures.")
+        print_green(f"Delay of CH{channel} to CH{reference_channel} measured in {measured} captures ({self.repeated_missed} missed) in {time.monotonic()-start:.2f} s.")
+        return delays[:measured]
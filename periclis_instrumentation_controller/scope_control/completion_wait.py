@@ -0,0 +1,109 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file completion_wait.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import math
+import time
+from pyvisa import constants
+from periclis_instrumentation_controller.utils.color_handling import *
+from periclis_instrumentation_controller.scope_control.device_specific_commands import ACCEPTED_WAIT_METHODS, ACCEPTED_TRIGGER_WAIT_METHODS, COMPLETION_COMMANDS, QUERY_COMMANDS
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_job
+
+WAIT_BACKOFF_FACTOR = 2 #Each poll waits twice as long as the previous one (limited by wait_poll_max).
+TRIGGER_WAITING_STATES = ('REA', 'ARM') #TRIGger:STATE? answers (READY, ARMED) of a capture not triggered yet.
+
+# Waits driven by the scope itself: the delay_* values of scope_config.csv are only upper bounds (timeouts).
+class completion_wait():
+    def wait_until(self, condition, timeout): #Polls condition() with a bounded backoff until it is True or the timeout (seconds) expires.
+        deadline = time.monotonic() + float(timeout)
+        interval = float(self.wait_poll_initial)
+        while True:
+            if condition():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * WAIT_BACKOFF_FACTOR, float(self.wait_poll_max))
+
+    def wait_operation_complete(self, timeout): #Returns as soon as the scope reports that the previous commands finished.
+        method = getattr(ACCEPTED_WAIT_METHODS, str(self.wait_method), ACCEPTED_WAIT_METHODS.busy)
+        try:
+            if method == ACCEPTED_WAIT_METHODS.busy:
+                return self.wait_until(self.scope_not_busy, timeout)
+            if method == ACCEPTED_WAIT_METHODS.esr:
+                self._write(COMPLETION_COMMANDS.set_operation_complete)
+                return self.wait_until(self.operation_complete_bit_set, timeout)
+            if method == ACCEPTED_WAIT_METHODS.opc:
+                return self.blocking_operation_complete(timeout)
+        except Exception as error: #Scope without the completion commands: the delays are fully waited from now on, as fixed sleeps.
+            print_yellow(f"Scope did not answer the '{method}' completion wait ({error}). The delays of scope_config.csv will be used as fixed waits.")
+            self.wait_method = ACCEPTED_WAIT_METHODS.sleep
+        time.sleep(float(timeout))
+        return True
+
+    def wait_for_trigger(self, timeout=None): #Returns the time (time.time()) at which the trigger was detected, or None if the timeout (trigger_wait_timeout, 0: unlimited) expired.
+        timeout = float(self.trigger_wait_timeout if timeout is None else timeout) or math.inf
+        if self.trigger_wait_method == ACCEPTED_TRIGGER_WAIT_METHODS.srq:
+            try:
+                return self.wait_service_request(timeout)
+            except Exception as error: #Backend or scope without service requests: polling is used from now on.
+                print_yellow(f"Service request not available ({error}). The trigger state will be polled.")
+                self.trigger_wait_method = ACCEPTED_TRIGGER_WAIT_METHODS.poll
+        self.trigger_state = None
+        if self.wait_until(self.trigger_happened, timeout):
+            return self.trigger_time
+        return None
+
+    def trigger_happened(self): #A single TRIGger:STATE? query per poll.
+        state = self._query(QUERY_COMMANDS.read_trigger_state).strip()
+        self.trigger_time = time.time()
+        if state != self.trigger_state: #Prints only the changes of state.
+            print(get_blue("Current trigger state is:"), get_green(state))
+            self.trigger_state = state
+        return not state.upper().startswith(TRIGGER_WAITING_STATES)
+
+    @instrument_job
+    def wait_service_request(self, timeout): #*OPC sets the operation complete bit when the single sequence finishes, which raises the SRQ.
+        self.scope_generator.enable_event(constants.EventType.service_request, constants.EventMechanism.queue)
+        try:
+            self._write(COMPLETION_COMMANDS.enable_service_request)
+            self._write(COMPLETION_COMMANDS.set_operation_complete)
+            response = self.scope_generator.wait_on_event(constants.EventType.service_request,
+                                                          constants.VI_TMO_INFINITE if timeout == math.inf else int(timeout*1000), capture_timeout=True)
+            trigger_time = time.time()
+            self._query(COMPLETION_COMMANDS.read_event_status) #Clears the operation complete bit.
+            return None if response.timed_out else trigger_time
+        finally:
+            self.scope_generator.disable_event(constants.EventType.service_request, constants.EventMechanism.queue)
+
+    def scope_not_busy(self):
+        return int(self._query(COMPLETION_COMMANDS.read_busy)) == 0
+
+    def operation_complete_bit_set(self):
+        return bool(int(self._query(COMPLETION_COMMANDS.read_event_status)) & COMPLETION_COMMANDS.operation_complete_bit)
+
+    @instrument_job
+    def blocking_operation_complete(self, timeout): #Timeout change, *OPC? and restore are a single job.
+        standard_timeout = self.scope_generator.timeout
+        self.scope_generator.timeout = float(timeout)*1000
+        try:
+            return int(self._query(COMPLETION_COMMANDS.read_operation_complete)) == 1
+        except Exception: #Timeout expired before the operation finished.
+            self.scope_generator.clear()
+            return False
+        finally:
+            self.scope_generator.timeout = standard_timeout
@@ -19,9 +19,12 @@ from pathlib import Path
 CONTROLLER_NAME = 'ScopeController'
 TRIGGER_THRESHOLD_PLOT_DIR = Path('./data/scope_data_read/scope_plot/')
 TRIGGER_THRESHOLD_DATA_DIR = Path('./data/scope_data_read/scope_csv/')
+CAPTURE_DATA_DIR = Path('./data/scope_data_read/scope_npz/')
 RESOURCE_DIR = Path('./data/configuration_files/')
 DEFAULT_CONFIGURATIONS = 'default_scope_config'
 FILE_NAME='scope_config'
 INPUT_FORMAT = '.csv'
 DATA_FORMAT='.csv'
+CAPTURE_FORMAT='.npz'
 FIGURE_FORMAT='.png'
+CAPABILITY_ATTRIBUTES = ('fastframe_supported', 'multi_channel_supported') #Probed once per session: kept by the resource manager across reconnections.
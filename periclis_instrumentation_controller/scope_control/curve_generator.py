@@ -23,35 +23,89 @@ from periclis_instrumentation_controller.utils.color_handling import *
 from periclis_instrumentation_controller.scope_control.scope_reader import *
 from periclis_instrumentation_controller.scope_control.controller_config import *
 from periclis_instrumentation_controller.scope_control.save_data import save_data
+from periclis_instrumentation_controller.scope_control.curve_transfer import query_channel_codes, codes_datatype, scale_codes
+from periclis_instrumentation_controller.scope_control.completion_wait import completion_wait
+from periclis_instrumentation_controller.scope_control.waveform_preamble import parse_preamble
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase, ScopeCapture
 from periclis_instrumentation_controller.scope_control.device_specific_commands import *
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_job
 
-class curve_generator(save_data):        
+class curve_generator(save_data, completion_wait):        
     def curve_manager(self): #Manages other methods to generates the wave.
         print("Wait while the curve data is being saved... Expected maximum wait time: 10 seconds.")
-        self.readscale()
         self.setting_acquisition(self.channel_std_trigger)
-        (self.scaled_time, self.scaled_wave) = self.acquire_data(self.channel_std_trigger)
-        self.acquire_new_channels()
+        self.readscale(self.channel_std_trigger)
+        channels = [int(self.channel_std_trigger)] + self.new_channels
+        if self.new_channels:
+            print(f"Acquiring data from extra channels... Additional expected wait time: {len(self.new_channels)*10} seconds.")
+        acquired = None
+        if int(self.multi_channel_acquisition) and self.new_channels:
+            acquired = self.acquire_all_channels(channels)
+        if acquired is None: #One curve transfer per channel.
+            acquired = [self.acquire_data(channel) for channel in channels]
+        self.capture = self.building_capture(channels, acquired)
+        (self.wave_lower_limit, self.wave_upper_limit) = self.capture.limits()
         self.store_data()        
 
-    def readscale(self):
-        self.trigger_current_threshold = float(self._query(QUERY_COMMANDS.read_trigger_threshold.format()))
-        self.wfm_record = int(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_wfm_record.format()))  
-        self.pre_trig_record = int(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_pre_trig_record.format()))
-        self.t_scale = float(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_t.format()))
-        self.t_sub = float(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_t_sub.format())) # sub-sample trigger correction.
-        self.v_scale = float(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_v.format())) # volts / level.
-        self.v_off = float(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_v_off.format())) # reference voltage.
-        self.v_pos = float(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_v_pos.format())) # reference position (level).
-    
-    def setting_acquisition(self, channel):
-        self.max_wave=0
-        self._write(WRITE_ACQUISITION.change_acquisition_encdg.format(acquisition_encdg='SRIBINARY'))
+    @instrument_job
+    def readscale(self, channel): #Preamble and trigger level come from the cache while the scope setup is unchanged.
+        if self.preamble_cache.trigger_level is None:
+            self.preamble_cache.trigger_level = float(self._query(QUERY_COMMANDS.read_trigger_threshold.format()))
+        self.trigger_current_threshold = self.preamble_cache.trigger_level
+        preamble = self.read_preamble(channel)
+        self.wfm_record = preamble.nr_pt
+        self.pre_trig_record = preamble.pt_off
+        self.t_scale = preamble.xincr
+        self.t_sub = preamble.xzero # sub-sample trigger correction.
+        self.v_scale = preamble.ymult # volts / level.
+        self.v_off = preamble.yzero # reference voltage.
+        self.v_pos = preamble.yoff # reference position (level).
+
+    @instrument_job
+    def read_preamble(self, channel): #Reads the whole preamble of the channel with a single WFMOutpre? query when the setup changed. Otherwise only xzero (sub-sample trigger correction, new at each trigger) is read.
         self._write(WRITE_ACQUISITION.change_acquisition_channel.format(acquisition_channel=('CH'+str(channel))))
-        self._write(WRITE_ACQUISITION.change_acquisition_start.format(acquisition_start=1))
+        if self.preamble_cache.get(channel) is not None:
+            return self.preamble_cache.retimed(channel, float(self._query(READ_SCALE_CURVE_GENERATOR.read_scale_t_sub)))
+        answer = parse_preamble(self._query(READ_SCALE_CURVE_GENERATOR.read_preamble))
+        preamble = self.preamble_cache.window_preamble(answer)
+        self.preamble_cache.store(channel, preamble, answer.xzero)
+        return preamble
+    
+    @instrument_job
+    def setting_acquisition(self, channel): #Done before every acquisition: a single message, without reading the error queue.
         self.acq_record = int(self._query(READ_SCALE_CURVE_GENERATOR.read_acquisition_horizontal.format()))
-        self._write(WRITE_ACQUISITION.change_acquisition_stop.format(acquisition_stop = self.acq_record))
-        self._write(WRITE_ACQUISITION.change_acquisition_byt_n.format(acquisition_byt_n=1))
+        (start, stop) = self.acquisition_window(channel)
+        with self.batched_writes(check_errors=False):
+            self._write(WRITE_ACQUISITION.change_acquisition_encdg.format(acquisition_encdg=getattr(ACCEPTED_BYTE_ORDERS, self.acquisition_byte_order)))
+            self._write(WRITE_ACQUISITION.change_acquisition_channel.format(acquisition_channel=('CH'+str(channel))))
+            self._write(WRITE_ACQUISITION.change_acquisition_start.format(acquisition_start=start))
+            self._write(WRITE_ACQUISITION.change_acquisition_stop.format(acquisition_stop=stop))
+            self._write(WRITE_ACQUISITION.change_acquisition_byt_n.format(acquisition_byt_n=int(self.acquisition_bytes_per_point))) #1 byte (8 bits) or 2 bytes (16 bits) per point.
+
+    def acquisition_window(self, channel): #First and last points (data:start, data:stop) transferred: the whole record, or only the region of interest (roi_mode).
+        if self.roi_mode == ACCEPTED_ROI_MODES.full:
+            self.preamble_cache.window_start = None
+            return (1, self.acq_record)
+        record = self.record_timebase(channel)
+        if self.roi_mode == ACCEPTED_ROI_MODES.time: #Points nearest to the times (relative to the trigger).
+            (start, stop) = (round((float(self.roi_start) - record.t_start)/record.xincr) + 1, round((float(self.roi_stop) - record.t_start)/record.xincr) + 1)
+        else:
+            (start, stop) = (int(self.roi_start), int(self.roi_stop))
+        (start, stop) = (max(start, 1), min(stop, self.acq_record))
+        if start > stop:
+            raise Exception(f"Region of interest ({self.roi_mode} {self.roi_start} to {self.roi_stop}) out of the record ({record.min()} to {record.max()} s, {self.acq_record} points)!")
+        self.preamble_cache.window_start = start
+        return (start, stop)
+
+    def record_timebase(self, channel): #Timebase of the whole record, read with data:start 1 only when the horizontal setup changes.
+        record = self.preamble_cache.record_timebase
+        if record is None or record.n != self.acq_record:
+            self.preamble_cache.window_start = None
+            self._write(WRITE_ACQUISITION.change_acquisition_start.format(acquisition_start=1))
+            self._write(WRITE_ACQUISITION.change_acquisition_stop.format(acquisition_stop=self.acq_record))
+            record = Timebase.from_preamble(self.read_preamble(channel))
+            self.preamble_cache.record_timebase = record
+        return record
 
     def acquire_data(self, channel): #Acquires data from scope.
         for count in range(int(self.acquisitions_retries)):
@@ -59,11 +113,10 @@ class curve_generator(save_data):
                 print(f"Will change to channel {channel}.")               
                 self._write(WRITE_ACQUISITION.change_acquisition_channel.format(acquisition_channel=('CH'+str(channel))))
                 print(f"Changed to channel {channel}.")
-                self.acquire_curve()
+                preamble = self.read_preamble(channel)
+                self.acquire_curve(preamble)
                 print(f"Data from channel {channel} acquired.")
-                scaled_time = self.horizontal_wave()
-                scaled_wave = self.vertical_wave()
-                return (scaled_time, scaled_wave)
+                return (self.bin_wave, preamble)
             except:
                 print_yellow(f"Error in communication. Communication with the scope will be retried until {3-count} more times...")
                 time.sleep(float(self.delay_acquisition_tentatives))
@@ -71,45 +124,50 @@ class curve_generator(save_data):
             raise Exception("Problem acquiring scope data! Check your connections")
          
     
-    def acquire_curve(self): 
-        self.bin_wave=self.scope_generator.query_binary_values('curve?', datatype='b', container=np.array, chunk_size = 1024**2)       
-        self.max_wave=(max(self.bin_wave) - self.v_pos) * self.v_scale + self.v_off
-        time.sleep(float(self.delay_acquisition)) #Delay to avoid too fast communication (seconds).  
+    def acquire_all_channels(self, channels): #Acquires the trigger channel and the extra channels with a single curve transfer.
+        if not getattr(self, 'multi_channel_supported', True): #Scope already refused the single transfer on this connection.
+            return None
+        sources = READ_ACQUISITION.sources_separator.join('CH'+str(channel) for channel in channels)
+        try:
+            preambles = [self.read_preamble(channel) for channel in channels]
+            self._write(WRITE_ACQUISITION.change_acquisition_channel.format(acquisition_channel=sources))
+            bin_waves = query_channel_codes(self.scope_generator, READ_ACQUISITION.read_curve, len(channels), codes_datatype(preambles[0]))
+            self.wait_operation_complete(self.delay_acquisition) #Waits the scope (up to the delay in seconds) to avoid too fast communication.
+        except Exception as error:
+            print_yellow(f"Scope did not accept the single transfer of channels {sources} ({error}). Channels will be acquired one by one.")
+            self.multi_channel_supported = False
+            self.scope_generator.clear() #Discards any partial answer before the channel by channel acquisition.
+            return None
+        print(f"Data from channels {sources} acquired.")
+        return list(zip(bin_waves, preambles))
+
+    def acquire_curve(self, preamble): #Codes are decoded straight from the received buffer, with the size and byte order given by the preamble.
+        self.bin_wave = query_channel_codes(self.scope_generator, READ_ACQUISITION.read_curve, 1, codes_datatype(preamble))[0]
+        self.wait_operation_complete(self.delay_acquisition) #Waits the scope (up to the delay in seconds) to avoid too fast communication.  
     
-    def horizontal_wave(self):
-        self.total_time = self.t_scale * self.wfm_record
+    def horizontal_wave(self): #Time of the points is kept implicit (first time, interval, number of points).
         self.t_start = (-self.pre_trig_record * self.t_scale) + self.t_sub
-        self.t_stop = self.t_start + self.total_time
-        return np.linspace(self.t_start, self.t_stop, num=self.wfm_record, endpoint=False)
+        return Timebase(self.t_start, self.t_scale, self.wfm_record)
         
-    def vertical_wave(self):             
-        self.unscaled_wave = np.array(self.bin_wave, dtype='double') # data type conversion 
-        return ((self.unscaled_wave - self.v_pos) * self.v_scale + self.v_off)
-
-    def acquire_new_channels(self):
-        self.configurating_new_acquisitions()
-        for channel in self.new_channels:
-            print(f"Acquisition from channel (channel) will start...")
-            _ , scaled_wave = self.acquire_data(channel)
-            print(f"Storing data from channel {channel}.")
-            setattr(self, f"scaled_wave{channel}", scaled_wave)
-            self.list_scaled_wave_other_channels.append(f"scaled_wave{channel}")
-            self.wave_minimums.append(min(scaled_wave))
-            self.wave_maximums.append(max(scaled_wave))
-        self.checking_wave_limits()
-
-    def configurating_new_acquisitions(self):
-        self.list_scaled_wave_other_channels = []
-        self.wave_minimums = []
-        self.wave_maximums = []
-        if self.new_channels:
-            print(f"Acquiring data from extra channels... Additional expected wait time: {len(self.new_channels)*10} seconds.")
+    def vertical_wave(self, bin_wave, preamble, scaled_wave):             
+        return scale_codes(bin_wave, preamble, scaled_wave) # volts, scaled in place.
+
+    def capture_dtype(self): #float32 or float64 volts.
+        return np.dtype(getattr(ACCEPTED_FLOAT_TYPES, self.acquisition_float_type))
+
+    def scratch_buffer(self, n_channels, n_points): #Preallocated (n_channels, n_points) volts array of the repeated captures, reused while the shape is the same. Never handed to a stored capture.
+        buffer = getattr(self, 'scratch_data', None)
+        if buffer is None or buffer.shape != (n_channels, n_points) or buffer.dtype != self.capture_dtype():
+            buffer = np.empty((n_channels, n_points), dtype=self.capture_dtype())
+            self.scratch_data = buffer
+        return buffer
 
-    def checking_wave_limits(self):
-        self.wave_minimums.append(min(self.scaled_wave))
-        self.wave_maximums.append(max(self.scaled_wave))
-        self.wave_lower_limit=min(self.wave_minimums)
-        self.wave_upper_limit=max(self.wave_maximums)   
+    def building_capture(self, channels, acquired): #acquired: (codes, preamble) of each channel. Each capture owns its volts array.
+        data = np.empty((len(channels), acquired[0][0].size), dtype=self.capture_dtype())
+        for row, (bin_wave, preamble) in zip(data, acquired):
+            self.vertical_wave(bin_wave, preamble, row)
+        return ScopeCapture(data, channels, [preamble for _, preamble in acquired], [bin_wave for bin_wave, _ in acquired],
+                            self.horizontal_wave(), self.trigger_current_threshold, bool(self.trigger_use), getattr(self, 'trigger_timestamp', None) or time.time())
 
     def store_data(self): #Stores Scope data.
         save_data.store_data(self)
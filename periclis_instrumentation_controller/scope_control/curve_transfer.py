@@ -0,0 +1,125 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file curve_transfer.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import time
+import numpy as np # http://www.numpy.org
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_worker
+
+BLOCK_HEADER = b'#'
+BLOCK_SEPARATOR = b';' #Separates the blocks when more than one source is sent by the same curve? query.
+MINIMUM_CHUNK_SIZE = 64*1024
+MAXIMUM_CHUNK_SIZE = 16*1024**2
+BENCHMARK_CHUNK_SIZES = tuple(16*1024 * 4**n for n in range(6)) #16 KiB to 16 MiB.
+DEFAULT_THROUGHPUT = 1e6 #Bytes/s assumed before the first measured transfer of a resource.
+THROUGHPUT_MINIMUM_BYTES = 64*1024 #Smaller blocks are dominated by the latency of the link and do not update the throughput estimate.
+THROUGHPUT_SMOOTHING = 0.25 #Weight of the last transfer in the throughput estimate.
+TRANSFER_TIMEOUT_MARGIN = 4 #Timeout of a block: 4 times its expected transfer time (never less than the timeout of the instrument).
+
+# Binary transfers of one resource: totals, throughput estimate and chunk size chosen by benchmark_transfer.
+class TransferStatistics():
+    def __init__(self) -> None:
+        self.transfers = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.throughput = None #Bytes/s, smoothed over the last transfers.
+        self.chunk_size = None #Fastest chunk size of benchmark_transfer (None: chunk sized from the block length).
+
+    def record(self, n_bytes: int, seconds: float):
+        self.transfers += 1
+        self.bytes += n_bytes
+        self.seconds += seconds
+        if n_bytes >= THROUGHPUT_MINIMUM_BYTES and seconds > 0:
+            rate = n_bytes / seconds
+            self.throughput = rate if self.throughput is None else self.throughput + THROUGHPUT_SMOOTHING*(rate - self.throughput)
+
+    def chunk(self, length: int): #Whole block in a single read (power of two above its length), within the chunk size limits.
+        if self.chunk_size is not None:
+            return self.chunk_size
+        return min(max(1 << (int(length) - 1).bit_length(), MINIMUM_CHUNK_SIZE), MAXIMUM_CHUNK_SIZE)
+
+    def timeout(self, length: int, instrument_timeout: float): #Timeout (ms) of a block with the length (bytes).
+        return max(length / (self.throughput or DEFAULT_THROUGHPUT) * 1000 * TRANSFER_TIMEOUT_MARGIN, instrument_timeout)
+
+TRANSFER_STATISTICS = {} #TransferStatistics of each resource name, kept while the CLI runs.
+
+def transfer_statistics(instrument) -> TransferStatistics:
+    return TRANSFER_STATISTICS.setdefault(getattr(instrument, 'resource_name', str(instrument)), TransferStatistics())
+
+def codes_datatype(preamble): #NumPy type of the curve codes described by the preamble (bytes per point, byte order and signedness).
+    byte_order = '>' if preamble.byt_or.upper().startswith('MSB') else '<'
+    kind = 'u' if preamble.bn_fmt.upper().startswith('RP') else 'i'
+    return np.dtype(f"{byte_order}{kind}{int(preamble.byt_nr)}")
+
+def scale_codes(codes, preamble, out): #Converts the codes to volts directly into the preallocated out array (no intermediate copies).
+    np.subtract(codes, preamble.yoff, out=out)
+    out *= preamble.ymult
+    out += preamble.yzero
+    return out
+
+def read_definite_block(instrument, chunk_size: int = None): #Reads one IEEE 488.2 definite length block (#<digits><length><data>). chunk_size None: sized from the block length.
+    header = instrument.read_bytes(2)
+    if header[:1] != BLOCK_HEADER or not header[1:2].isdigit() or header[1:2] == b'0':
+        raise Exception(f"Invalid binary block header received from the scope: {header}")
+    length = int(instrument.read_bytes(int(header[1:2])))
+    statistics = transfer_statistics(instrument)
+    instrument_timeout = instrument.timeout
+    if instrument_timeout is not None: #Long blocks get the time they need on this link, short ones keep the timeout of the instrument.
+        instrument.timeout = statistics.timeout(length, instrument_timeout)
+    start = time.perf_counter()
+    try:
+        data = instrument.read_bytes(length, chunk_size=chunk_size or statistics.chunk(length))
+    finally:
+        instrument.timeout = instrument_timeout
+    statistics.record(length, time.perf_counter() - start)
+    separator = instrument.read_bytes(1) #Either the separator of the next block or the termination character.
+    return data, separator
+
+def read_block_sequence(instrument, chunk_size: int = None): #Reads every block answered by a single query.
+    blocks = []
+    while True:
+        data, separator = read_definite_block(instrument, chunk_size)
+        blocks.append(data)
+        if separator != BLOCK_SEPARATOR:
+            return blocks
+
+def split_channel_codes(blocks: list, number_channels: int, datatype='b'): #Converts the received blocks into one array of codes per channel (views of the received buffers).
+    if len(blocks) == number_channels: #One block per channel.
+        return [np.frombuffer(block, dtype=datatype) for block in blocks]
+    if len(blocks) == 1: #All channels concatenated in the same block.
+        codes = np.frombuffer(blocks[0], dtype=datatype)
+        if codes.size % number_channels:
+            raise Exception(f"Scope block with {codes.size} points can not be split into {number_channels} channels!")
+        return list(codes.reshape(number_channels, -1))
+    raise Exception(f"Scope answered {len(blocks)} blocks, but {number_channels} channels were requested!")
+
+def query_channel_codes(instrument, query_string: str, number_channels: int, datatype='b', chunk_size: int = None): #Sends the curve query once and returns the codes of every channel.
+    def transfer(): #The query and the reads of its blocks are a single job of the instrument worker.
+        instrument.write(query_string)
+        return split_channel_codes(read_block_sequence(instrument, chunk_size), number_channels, datatype)
+    return instrument_worker(instrument).run(transfer)
+
+def benchmark_chunk_sizes(instrument, query_string: str, number_channels: int, datatype, repetitions: int, chunk_sizes=BENCHMARK_CHUNK_SIZES): #Best throughput (bytes/s) of the curve query with each chunk size.
+    statistics = transfer_statistics(instrument)
+    rates = {}
+    for chunk_size in chunk_sizes:
+        rates[chunk_size] = 0.0
+        for _ in range(repetitions):
+            (n_bytes, seconds) = (statistics.bytes, statistics.seconds)
+            query_channel_codes(instrument, query_string, number_channels, datatype, chunk_size)
+            if statistics.seconds > seconds:
+                rates[chunk_size] = max(rates[chunk_size], (statistics.bytes - n_bytes) / (statistics.seconds - seconds))
+    return rates
@@ -38,9 +38,55 @@ class ACCEPTED_TRIGGER_SLOPE:
     rise = 'RISE'
     fall = 'FALL'
 
+class ACCEPTED_BYTE_ORDERS:
+    msb = 'RIBINARY' #Signed integer codes, most significant byte first.
+    lsb = 'SRIBINARY' #Signed integer codes, least significant byte first (swapped).
+
+class ACCEPTED_FLOAT_TYPES:
+    float32 = 'float32'
+    float64 = 'float64'
+
+class ACCEPTED_STORAGE_FORMATS:
+    csv = 'csv' #Time and volts as text (Scope_Data*.csv).
+    npz = 'npz' #Raw codes, preambles and metadata (Scope_Capture*.npz).
+    both = 'both'
+
+class ACCEPTED_ROI_MODES: #Region of interest: points of the record transferred by curve? (data:start/data:stop).
+    full = 'full' #Whole record.
+    time = 'time' #From roi_start to roi_stop seconds, relative to the trigger.
+    points = 'points' #From point roi_start to point roi_stop of the record (1 to record length).
+
+class ACCEPTED_RECORD_LENGTHS: #Record length presets (points). Shorter records are transferred faster, at the cost of the sample rate for the same time scale.
+    fast = 1000
+    standard = 10000
+    long = 100000
+    maximum = 1000000
+
+class ACCEPTED_AVERAGING_MODES:
+    mean = 'mean' #Arithmetic mean of the captures.
+    exponential = 'exponential' #Each capture weighs 1/averaging_count (1/n during the first captures).
+    envelope = 'envelope' #Mean plus the minimum and maximum of every point.
+
+class ACCEPTED_SPECTRUM_WINDOWS:
+    rectangular = 'rectangular' #Only for coherent sampling (integer number of periods in the record).
+    hann = 'hann'
+    blackman = 'blackman'
+    blackmanharris = 'blackmanharris' #Lowest leakage (ADC characterization: THD, SNR, SINAD, ENOB).
+
+class ACCEPTED_TRIGGER_WAIT_METHODS:
+    poll = 'poll' #One TRIGger:STATE? per poll, with a growing interval between polls.
+    srq = 'srq' #Service request raised by *OPC when the single sequence finishes (VISA backends with event support).
+
+class ACCEPTED_WAIT_METHODS:
+    busy = 'busy' #Polls BUSY? until the scope is not busy.
+    esr = 'esr' #Sends *OPC and polls *ESR? until the operation complete bit is set.
+    opc = 'opc' #Blocks on *OPC? using the delay as timeout.
+    sleep = 'sleep' #Waits the whole delay (scopes without completion commands).
+
 
 class WRITE_COMMANDS:      
     autoscale = 'AUTOSET EXECute' #Autoscale.   
+    reset = '*RST' #Returns the scope to its factory settings.
     single = 'FPANEL:PRESS SINGleseq' #Equals pressing Single button.   
     run_stop = 'FPANEL:PRESS RUnstop' #Equals pressing Run/Stop button.   
     change_channel_on = 'SELECT:CH{channel} ON' #Turns the channel on.  
@@ -62,6 +108,7 @@ class WRITE_COMMANDS:
 class QUERY_COMMANDS:
     read_channel_state = 'SELECT:CH{channel}?' #Returns if the channel is on or off.   
     read_trigger_state = 'TRIGger:STATE?' #Returns the state of the trigger: ARMED, AUTO, READY, SAVE or TRIGGER.
+    read_acquisition_state = 'ACQuire:STATE?' #Returns 0 when the acquisition is stopped (single sequence finished) and 1 while it is running.
     read_scale_wfm_record = 'wfmoutpre:nr_pt?' 
     read_scale_pre_trig_record = 'wfmoutpre:pt_off?'
     read_scale_t = 'wfmoutpre:xincr?'
@@ -88,6 +135,33 @@ class WRITE_ACQUISITION:
     change_acquisition_start = 'data:start {acquisition_start}'    
     change_acquisition_stop = 'data:stop {acquisition_stop}'
     change_acquisition_byt_n = 'wfmoutpre:byt_n {acquisition_byt_n}'
+    change_record_length = 'horizontal:recordlength {record_length}'
+
+class FASTFRAME_COMMANDS: #Segmented memory: each trigger event is stored as a frame of the same record.
+    read_max_frames = 'HORizontal:FASTframe:MAXFRames?' #Returns the maximum number of frames for the current record length.
+    change_state = 'HORizontal:FASTframe:STATE {state}'
+    change_count = 'HORizontal:FASTframe:COUNt {count}'
+    change_frame_start = 'DATa:FRAMESTARt {frame}' #First frame transferred by curve?.
+    change_frame_stop = 'DATa:FRAMESTOP {frame}' #Last frame transferred by curve?.
+    read_timestamps = 'HORizontal:FASTframe:TIMEStamp:ALL:CH{channel}? 1,{count}' #Returns the trigger time stamp of each frame.
+
+class COMPLETION_COMMANDS:
+    read_busy = 'BUSY?' #Returns 1 while the scope is executing an operation and 0 after it finishes.
+    read_event_status = '*ESR?' #Returns (and clears) the Standard Event Status Register.
+    read_operation_complete = '*OPC?' #Returns 1 after all pending operations finish.
+    set_operation_complete = '*OPC' #Sets the operation complete bit of the *ESR? register after all pending operations finish.
+    operation_complete_bit = 1 #Bit of the *ESR? register set by *OPC.
+    enable_service_request = 'DESE 1;*ESE 1;*SRE 32' #The operation complete bit raises a service request (SRQ).
+
+class ERROR_COMMANDS: #Event queue, read once after each batch of writes.
+    read_event_status = '*ESR?' #Moves the pending events to the event queue.
+    read_error = 'EVMsg?' #Returns the oldest event: <code>,"<message>".
+    no_error_codes = (0, 1) #0: queue empty, 1: no events to report.
+    error_codes = range(100, 400) #Command (1xx), execution (2xx) and device (3xx) errors. Other events (e.g. 402 "Operation complete" of the completion waits) are skipped.
+
+class READ_ACQUISITION:
+    read_curve = 'curve?' #Returns the waveform codes of the channel(s) set on data:source.
+    sources_separator = ',' #Separator used on data:source for transferring several channels with a single curve? query.
 
 
 
@@ -100,3 +174,6 @@ class READ_SCALE_CURVE_GENERATOR:
     read_scale_v_off = 'wfmoutpre:yzero?'
     read_scale_v_pos = 'wfmoutpre:yoff?'
     read_acquisition_horizontal = 'horizontal:recordlength?'
+    read_preamble = 'HEADer 1;:WFMOutpre?;:HEADer 0' #Whole preamble of the data:source channel, answered with headers so that the field order of each model does not matter.
+
+PREAMBLE_FIELDS = ('BYT_Nr', 'BIT_Nr', 'ENCdg', 'BN_Fmt', 'BYT_Or', 'WFId', 'NR_Pt', 'PT_Fmt', 'XUNit', 'XINcr', 'XZEro', 'PT_Off', 'YUNit', 'YMUlt', 'YOFf', 'YZEro') #Order of the WFMOutpre? fields (used if the answer comes without headers).
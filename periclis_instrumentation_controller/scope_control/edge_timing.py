@@ -0,0 +1,94 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file edge_timing.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import numpy as np # http://www.numpy.org
+
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+from periclis_instrumentation_controller.scope_control.waveform_measurements import crossing_mask
+
+## Edges of every wave of an array shaped (..., points) as flat arrays: the wave of each edge (index of the flattened leading axes) and its time.
+## Edges are sorted by wave and, inside each wave, by time, so the statistics of each wave are reductions over contiguous groups (no loop over the waves or edges).
+
+JITTER_UNITS = {'edges': '', 'period_mean': 's', 'period_jitter_rms': 's', 'period_jitter_pp': 's', 'cycle_to_cycle_rms': 's', 'cycle_to_cycle_pp': 's', 'tie_rms': 's', 'tie_pp': 's'}
+
+def edge_times(waves, timebase: Timebase, level, rising: bool = True): #(wave, time) of the crossings of level (one level, or one per wave), with linear interpolation between the two points.
+    waves = np.asarray(waves)
+    flat_waves = waves.reshape(-1, waves.shape[-1])
+    flat_level = np.broadcast_to(np.asarray(level, dtype='double'), waves.shape[:-1]).reshape(-1)
+    (wave, index) = np.nonzero(crossing_mask(flat_waves, flat_level, rising))
+    before = flat_waves[wave, index].astype('double')
+    after = flat_waves[wave, index+1].astype('double')
+    position = index + (flat_level[wave] - before) / (after - before)
+    return (wave, timebase.t_start + position*timebase.xincr)
+
+def group_reduce(function, values, wave, n_waves: int, empty=np.nan): #function.reduceat over the values of each wave (empty waves: empty).
+    result = np.full(n_waves, empty, dtype='double')
+    if values.size:
+        starts = np.flatnonzero(np.r_[True, wave[1:] != wave[:-1]])
+        result[wave[starts]] = function.reduceat(values, starts)
+    return result
+
+def group_statistics(values, wave, n_waves: int): #Count, mean, rms deviation and peak to peak of the values of each wave.
+    count = np.bincount(wave, minlength=n_waves)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.bincount(wave, values, minlength=n_waves) / count
+        deviation = np.sqrt(np.maximum(np.bincount(wave, np.square(values - mean[wave]), minlength=n_waves) / count, 0))
+    peak_to_peak = group_reduce(np.maximum, values, wave, n_waves) - group_reduce(np.minimum, values, wave, n_waves)
+    return (count, mean, deviation, peak_to_peak)
+
+def consecutive_differences(values, wave): #Differences between consecutive values of the same wave, and their waves.
+    same_wave = wave[1:] == wave[:-1]
+    return (np.diff(values)[same_wave], wave[1:][same_wave])
+
+def time_interval_error(times, wave, n_waves: int): #Edge time minus the ideal clock (least squares line of the edge time by the edge number) of its wave.
+    count = np.bincount(wave, minlength=n_waves)
+    first_edge = np.cumsum(count) - count
+    number = np.arange(times.size) - first_edge[wave] #Edge number inside its wave.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_number = np.bincount(wave, number, minlength=n_waves) / count
+        mean_time = np.bincount(wave, times, minlength=n_waves) / count
+        centered = number - mean_number[wave]
+        period = np.bincount(wave, centered * (times - mean_time[wave]), minlength=n_waves) / np.bincount(wave, np.square(centered), minlength=n_waves)
+    return times - (mean_time[wave] + centered*period[wave])
+
+def jitter_analysis(waves, timebase: Timebase, level, rising: bool = True) -> dict:
+    #Period, period jitter, cycle-to-cycle jitter and time interval error (TIE) of each wave, shaped (...). Also the raw values ('tie', 'periods'...) with their waves, for histograms.
+    waves = np.asarray(waves)
+    shape = waves.shape[:-1]
+    n_waves = int(np.prod(shape))
+    (wave, times) = edge_times(waves, timebase, level, rising)
+    (periods, period_wave) = consecutive_differences(times, wave)
+    (cycle_to_cycle, cycle_wave) = consecutive_differences(periods, period_wave)
+    tie = time_interval_error(times, wave, n_waves)
+    (edges, _, _, _) = group_statistics(times, wave, n_waves)
+    (_, period_mean, period_rms, period_pp) = group_statistics(periods, period_wave, n_waves)
+    (_, _, cycle_rms, cycle_pp) = group_statistics(cycle_to_cycle, cycle_wave, n_waves)
+    (_, _, tie_rms, tie_pp) = group_statistics(tie, wave, n_waves)
+    statistics = {'edges': edges, 'period_mean': period_mean, 'period_jitter_rms': period_rms, 'period_jitter_pp': period_pp,
+                  'cycle_to_cycle_rms': cycle_rms, 'cycle_to_cycle_pp': cycle_pp, 'tie_rms': tie_rms, 'tie_pp': tie_pp}
+    values = {'edge_times': (times, wave), 'tie': (tie, wave), 'periods': (periods, period_wave), 'cycle_to_cycle': (cycle_to_cycle, cycle_wave)}
+    return ({name: value.reshape(shape) for (name, value) in statistics.items()}, values)
+
+def channel_histograms(values, wave, n_waves: int, n_channels: int, bins: int): #Histogram of the values of each channel (segments pooled), each one over its own range: counts (channels, bins) and edges (channels, bins+1).
+    low = np.fmin.reduce(group_reduce(np.minimum, values, wave, n_waves).reshape(-1, n_channels), axis=0) #Waves are flattened from (..., channels).
+    high = np.fmax.reduce(group_reduce(np.maximum, values, wave, n_waves).reshape(-1, n_channels), axis=0)
+    low = np.where(np.isnan(low), 0, low)
+    width = np.where(high > low, high - low, np.finfo('float32').eps)
+    channel = wave % n_channels
+    index = np.minimum(((values - low[channel]) / width[channel] * bins).astype(np.intp), bins - 1)
+    counts = np.bincount(channel*bins + index, minlength=n_channels*bins).reshape(n_channels, bins)
+    return (counts, low[:, np.newaxis] + width[:, np.newaxis] * (np.arange(bins + 1) / bins))
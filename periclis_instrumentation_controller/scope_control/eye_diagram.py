@@ -0,0 +1,166 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file eye_diagram.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import time
+import matplotlib.pyplot as plt # http://matplotlib.org/ - for plotting
+import numpy as np # http://www.numpy.org
+from pathlib import Path
+
+from periclis_instrumentation_controller.utils.color_handling import *
+from periclis_instrumentation_controller.scope_control.controller_config import *
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+from periclis_instrumentation_controller.scope_control.edge_timing import edge_times
+
+EYE_UNIT_INTERVALS = 2 #Bit periods shown in the eye (a whole eye between two crossings).
+EYE_VOLTAGE_MARGIN = 0.1 #Fraction of the first capture excursion added above and below the histogram voltage range.
+EYE_CENTER_WINDOW = 0.2 #Fraction of the bit period, around the eye center, where the levels are measured.
+EYE_SIGMAS = 3 #Eye height and width measured between the levels and the crossings +/- 3 standard deviations.
+EYE_UNITS = {'eye_height': 'V', 'eye_width': 's', 'eye_amplitude': 'V', 'threshold': 'V', 'crossing_time': 's', 'crossing_jitter': 's'}
+
+# Persistence histogram (channels, voltage bins, time bins) of captures folded modulo the bit period. Its size does not depend on the number of captures.
+# Crossing time and jitter come from the interpolated crossings of the threshold (edge_timing), folded modulo the bit period: edges with few samples step over the histogram rows.
+class EyeDiagram():
+    def __init__(self, channels: list, bit_period: float, time_bins: int, voltage_bins: int, voltage_low, voltage_high) -> None:
+        if int(time_bins) < EYE_UNIT_INTERVALS:
+            raise Exception(f"The eye diagram needs at least {EYE_UNIT_INTERVALS} time bins (one per bit period), {time_bins} given! Check eye_time_bins.")
+        n_channels = len(channels)
+        self.channels = [int(channel) for channel in channels]
+        self.bit_period = float(bit_period)
+        self.time_bins = int(time_bins) - int(time_bins) % EYE_UNIT_INTERVALS #Same number of bins in each bit period.
+        self.voltage_bins = int(voltage_bins)
+        self.voltage_low = np.asarray(voltage_low, dtype='double').reshape(n_channels)
+        self.voltage_high = np.asarray(voltage_high, dtype='double').reshape(n_channels)
+        self.histogram = np.zeros((n_channels, self.voltage_bins, self.time_bins), dtype=np.int64)
+        self.threshold = (self.voltage_low + self.voltage_high) / 2 #Middle of the excursion of the first capture.
+        self.crossing_count = np.zeros(n_channels, dtype=np.int64)
+        self.crossing_phasor = np.zeros(n_channels, dtype=complex) #Sum of exp(2j*pi*crossing time/bit period) of each channel.
+        self.captures = 0
+        self.samples_out = 0 #Samples outside the voltage range (not in the histogram).
+        self.timebase_key = None
+        self.time_index = None
+
+    @classmethod
+    def from_waves(cls, waves, channels: list, bit_period: float, time_bins: int, voltage_bins: int): #Voltage range of each channel from its first capture (plus a margin).
+        waves = np.asarray(waves)
+        minimum = waves.min(axis=-1).reshape(-1, waves.shape[-2]).min(axis=0)
+        maximum = waves.max(axis=-1).reshape(-1, waves.shape[-2]).max(axis=0)
+        margin = np.maximum(maximum - minimum, np.finfo('float32').eps) * EYE_VOLTAGE_MARGIN
+        return cls(channels, bit_period, time_bins, voltage_bins, minimum - margin, maximum + margin)
+
+    def time_bins_of(self, timebase: Timebase): #Time bin of each point (time relative to the trigger folded modulo EYE_UNIT_INTERVALS bit periods), computed once per timebase.
+        key = (timebase.t_start, timebase.xincr, timebase.n)
+        if key != self.timebase_key:
+            phase = np.mod(timebase.values() / self.bit_period, EYE_UNIT_INTERVALS)
+            self.time_index = np.minimum((phase * (self.time_bins / EYE_UNIT_INTERVALS)).astype(np.intp), self.time_bins - 1)
+            self.timebase_key = key
+        return self.time_index
+
+    def accumulate(self, waves, timebase: Timebase): #Adds (channels, points) or (segments, channels, points) volts to the histogram with a single bincount.
+        n_channels = self.histogram.shape[0]
+        waves = np.asarray(waves).reshape(-1, n_channels, timebase.n)
+        scale = (self.voltage_bins / (self.voltage_high - self.voltage_low))[:, np.newaxis]
+        voltage_index = np.floor((waves - self.voltage_low[:, np.newaxis]) * scale).astype(np.intp)
+        voltage_index[(voltage_index < 0) | (voltage_index >= self.voltage_bins)] = self.voltage_bins #Extra row of each channel, discarded after counting.
+        flat_index = voltage_index * self.time_bins + self.time_bins_of(timebase)
+        flat_index += (np.arange(n_channels) * ((self.voltage_bins + 1) * self.time_bins))[:, np.newaxis]
+        counts = np.bincount(flat_index.ravel(), minlength=n_channels * (self.voltage_bins + 1) * self.time_bins).reshape(n_channels, self.voltage_bins + 1, self.time_bins)
+        self.histogram += counts[:, :self.voltage_bins]
+        self.samples_out += int(counts[:, self.voltage_bins].sum())
+        self.accumulate_crossings(waves, timebase)
+        self.captures += waves.shape[0]
+
+    def accumulate_crossings(self, waves, timebase: Timebase): #Rising and falling crossings of the threshold of each channel, as phasors of their phase in the bit period.
+        n_channels = self.histogram.shape[0]
+        level = np.broadcast_to(self.threshold, waves.shape[:-1])
+        for rising in (True, False):
+            (wave, times) = edge_times(waves, timebase, level, rising)
+            channel = wave % n_channels
+            phasors = np.exp(2j*np.pi*(times / self.bit_period))
+            self.crossing_count += np.bincount(channel, minlength=n_channels)
+            self.crossing_phasor += np.bincount(channel, phasors.real, minlength=n_channels) + 1j*np.bincount(channel, phasors.imag, minlength=n_channels)
+
+    def volts(self): #Center voltage of the bins of each channel, (channels, voltage bins).
+        return self.voltage_low[:, np.newaxis] + (np.arange(self.voltage_bins) + 0.5) * ((self.voltage_high - self.voltage_low) / self.voltage_bins)[:, np.newaxis]
+
+    def measurements(self) -> dict: #Eye height/width, amplitude, threshold, crossing time and jitter of each channel, shaped (channels). NaN on channels without crossings.
+        bit_bins = self.time_bins // EYE_UNIT_INTERVALS
+        folded = self.histogram.reshape(self.histogram.shape[0], self.voltage_bins, EYE_UNIT_INTERVALS, bit_bins).sum(axis=2) #(channels, voltage bins, bins of one bit period).
+        volts = self.volts()
+        crossed = self.crossing_count > 0
+        if not crossed.all():
+            print_yellow(f"No crossing of the threshold found on channels {[channel for (channel, found) in zip(self.channels, crossed) if not found]}: their eye is not measured.")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            resultant = self.crossing_phasor / self.crossing_count #Crossing statistics are circular (the bit period wraps around).
+            crossing_phase = np.mod(np.angle(resultant) / (2*np.pi), 1)
+            crossing_jitter = np.sqrt(-2*np.log(np.minimum(np.abs(resultant), 1))) / (2*np.pi) #Bit periods.
+            center = (np.mod(np.where(crossed, crossing_phase, 0) + 0.5, 1) * bit_bins).astype(np.intp)
+            window = (center[:, np.newaxis] + np.arange(-int(EYE_CENTER_WINDOW/2*bit_bins), int(EYE_CENTER_WINDOW/2*bit_bins) + 1)) % bit_bins
+            column = np.take_along_axis(folded, window[:, np.newaxis, :], axis=2).sum(axis=-1) #Hits around the eye center, (channels, voltage bins).
+            upper = np.where(volts > self.threshold[:, np.newaxis], column, 0)
+            lower = column - upper
+            (upper_mean, upper_deviation) = weighted_statistics(volts, upper)
+            (lower_mean, lower_deviation) = weighted_statistics(volts, lower)
+        return {
+            'eye_height': np.where(crossed, np.maximum((upper_mean - EYE_SIGMAS*upper_deviation) - (lower_mean + EYE_SIGMAS*lower_deviation), 0), np.nan),
+            'eye_width': np.maximum(1 - 2*EYE_SIGMAS*crossing_jitter, 0) * self.bit_period,
+            'eye_amplitude': np.where(crossed, upper_mean - lower_mean, np.nan),
+            'threshold': self.threshold,
+            'crossing_time': crossing_phase * self.bit_period, #Relative to the trigger, modulo the bit period.
+            'crossing_jitter': crossing_jitter * self.bit_period,
+        }
+
+    def render(self, file_path): #Saves the histogram of each channel (logarithmic color scale) without blocking.
+        fig, axes = plt.subplots(len(self.channels), 1, squeeze=False, figsize=(8, 3*len(self.channels)))
+        for (ax, histogram, low, high, channel) in zip(axes[:, 0], self.histogram, self.voltage_low, self.voltage_high, self.channels):
+            ax.imshow(np.log1p(histogram), origin='lower', aspect='auto', cmap='inferno', extent=(0, EYE_UNIT_INTERVALS*self.bit_period, low, high))
+            ax.set_title(f"Eye diagram CH{channel} ({self.captures} captures)")
+            ax.set_xlabel('Time (Seconds)')
+            ax.set_ylabel('Voltage (Volts)')
+        fig.tight_layout()
+        fig.savefig(file_path)
+        plt.close(fig)
+
+def weighted_statistics(values, weights): #Mean and standard deviation along the last axis.
+    mean = (values * weights).sum(axis=-1) / weights.sum(axis=-1)
+    return (mean, np.sqrt((np.square(values - mean[:, np.newaxis]) * weights).sum(axis=-1) / weights.sum(axis=-1)))
+
+# Captures re-armed back to back (capture_stream.repeated_waves) and folded into the eye histogram as they arrive (only one capture in memory).
+class eye_persistence():
+    def eye_manager(self, bit_period: float, captures: int, keep: bool):
+        channels = [int(self.channel_std_trigger)] + self.new_channels
+        eye = getattr(self, 'eye', None)
+        if not keep or eye is None or eye.bit_period != bit_period or eye.channels != channels:
+            eye = None
+        start = time.monotonic()
+        try:
+            for (waves, timebase) in self.repeated_waves(channels, captures):
+                if eye is None:
+                    eye = EyeDiagram.from_waves(waves, channels, bit_period, int(self.eye_time_bins), int(self.eye_voltage_bins))
+                eye.accumulate(waves, timebase)
+        except KeyboardInterrupt:
+            print_yellow("\nEye accumulation interrupted by the user.")
+        if eye is None:
+            print_red("No capture accumulated!")
+            return
+        self.eye = eye
+        elapsed = time.monotonic() - start
+        print_green(f"{eye.captures} captures in the eye diagram of channels {channels} ({self.repeated_missed} missed, {eye.samples_out} samples out of the voltage range) in {elapsed:.2f} s.")
+        self.date_seconds()
+        TRIGGER_THRESHOLD_PLOT_DIR.mkdir(parents=True, exist_ok=True)
+        file_path = Path(TRIGGER_THRESHOLD_PLOT_DIR/f"Scope_Eye{self.dt}{FIGURE_FORMAT}")
+        eye.render(file_path)
+        print_green(f"Eye diagram saved in {file_path}.")
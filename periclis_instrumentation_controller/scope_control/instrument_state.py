@@ -0,0 +1,104 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file instrument_state.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import time
+from periclis_instrumentation_controller.scope_control.device_specific_commands import WRITE_COMMANDS, QUERY_COMMANDS
+from periclis_instrumentation_controller.utils.command_templates import match_template
+
+# Settings shadowed: templates that write them and template that reads them back (one setting per channel when the templates have {channel}).
+STATE_WRITE_TEMPLATES = {
+    WRITE_COMMANDS.change_channel_on: 'channel_state',
+    WRITE_COMMANDS.change_channel_off: 'channel_state',
+    WRITE_COMMANDS.change_probe_gain: 'probe_gain',
+    WRITE_COMMANDS.change_scale_x: 'scale_x',
+    WRITE_COMMANDS.change_scale_y: 'scale_y',
+    WRITE_COMMANDS.change_reference_level: 'reference_level',
+    WRITE_COMMANDS.change_trigger_threshold: 'trigger_threshold',
+    WRITE_COMMANDS.change_trigger_holdoff: 'trigger_holdoff',
+    WRITE_COMMANDS.change_trigger_type: 'trigger_type',
+    WRITE_COMMANDS.change_trigger_channel: 'trigger_channel',
+    WRITE_COMMANDS.change_trigger_coupling: 'trigger_coupling',
+    WRITE_COMMANDS.change_trigger_slope: 'trigger_slope',
+}
+STATE_READ_TEMPLATES = {
+    QUERY_COMMANDS.read_channel_state: 'channel_state',
+    QUERY_COMMANDS.read_probe_gain: 'probe_gain',
+    QUERY_COMMANDS.read_scale_x: 'scale_x',
+    QUERY_COMMANDS.read_scale_y: 'scale_y',
+    QUERY_COMMANDS.read_reference_level: 'reference_level',
+    QUERY_COMMANDS.read_trigger_threshold: 'trigger_threshold',
+    QUERY_COMMANDS.read_trigger_holdoff: 'trigger_holdoff',
+    QUERY_COMMANDS.read_trigger_type: 'trigger_type',
+    QUERY_COMMANDS.read_trigger_channel: 'trigger_channel',
+    QUERY_COMMANDS.read_trigger_coupling: 'trigger_coupling',
+    QUERY_COMMANDS.read_trigger_slope: 'trigger_slope',
+}
+STATE_DEPENDENCIES = {'probe_gain': ('scale_y', 'reference_level')} #The probe gain changes the scale (and position) of its channel.
+STATE_RESET_COMMANDS = (WRITE_COMMANDS.autoscale, WRITE_COMMANDS.reset) #Change every setting.
+
+def state_key(command: str, templates: dict): #(setting, channel) changed or read by the command, None if it is not shadowed.
+    for template, setting in templates.items():
+        arguments = match_template(command, template)
+        if arguments is not None:
+            return (setting, arguments.get('channel'))
+    return None
+
+# Last value written (command) and last value read (answer) of each setting, with their times. Entries older than the TTL are ignored.
+class InstrumentState():
+    def __init__(self) -> None:
+        self.written = {} #key: (command, time).
+        self.answers = {} #key: (answer, time).
+
+    def unchanged(self, command: str, ttl: float): #True if the same command was written less than ttl seconds ago (the write can be skipped).
+        key = state_key(command, STATE_WRITE_TEMPLATES)
+        entry = self.written.get(key)
+        return key is not None and entry is not None and entry[0].lower() == command.lower() and time.monotonic() - entry[1] < ttl
+
+    def store_write(self, command: str):
+        if any(match_template(command, template) is not None for template in STATE_RESET_COMMANDS):
+            self.invalidate()
+            return
+        key = state_key(command, STATE_WRITE_TEMPLATES)
+        if key is not None:
+            self.written[key] = (command, time.monotonic())
+            self.answers.pop(key, None) #The scope may round the value: the next read asks it again.
+            for setting in STATE_DEPENDENCIES.get(key[0], ()):
+                self.forget((setting, key[1]))
+
+    def cached_answer(self, query: str, ttl: float): #Answer of the last identical read, if it is younger than ttl seconds.
+        entry = self.answers.get(state_key(query, STATE_READ_TEMPLATES))
+        if entry is not None and time.monotonic() - entry[1] < ttl:
+            return entry[0]
+        return None
+
+    def store_answer(self, query: str, answer: str):
+        key = state_key(query, STATE_READ_TEMPLATES)
+        if key is not None:
+            self.answers[key] = (answer, time.monotonic())
+
+    def forget(self, key):
+        self.written.pop(key, None)
+        self.answers.pop(key, None)
+
+    def invalidate(self): #Autoscale, reset, refused commands or front panel changes.
+        self.written.clear()
+        self.answers.clear()
+
+INSTRUMENT_STATES = {} #InstrumentState of each resource name, kept while the CLI runs.
+
+def instrument_state(instrument) -> InstrumentState:
+    return INSTRUMENT_STATES.setdefault(getattr(instrument, 'resource_name', str(instrument)), InstrumentState())
@@ -0,0 +1,108 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file mask_test.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import numpy as np # http://www.numpy.org
+from pathlib import Path
+from numpy.lib.stride_tricks import sliding_window_view
+
+from periclis_instrumentation_controller.utils.color_handling import *
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+from periclis_instrumentation_controller.scope_control.waveform_measurements import first_index
+
+MASK_DATA_DIR = Path('./data/scope_data_read/scope_mask/')
+MASK_PRINTED_FAILURES = 10 #Failed captures detailed by print_mask_summary.
+
+# Upper and lower tolerance envelope of each channel, (channels, points), on the timebase of the reference capture.
+class WaveformMask():
+    def __init__(self, channels: list, lower, upper, timebase: Timebase) -> None:
+        self.channels = [int(channel) for channel in channels]
+        self.lower = np.asarray(lower, dtype='float32')
+        self.upper = np.asarray(upper, dtype='float32')
+        self.timebase = timebase
+        self.codes_key = None
+        self.codes_limits = None
+
+    @classmethod
+    def from_waves(cls, waves, channels: list, timebase: Timebase, voltage_tolerance: float, time_tolerance: float):
+        #Envelope of the reference waves ((channels, points) or N captures (N, channels, points)), widened by time_tolerance (s) on each side and by voltage_tolerance (V).
+        waves = np.asarray(waves).reshape(-1, len(channels), timebase.n)
+        (lower, upper) = (waves.min(axis=0), waves.max(axis=0))
+        shift = int(round(time_tolerance / timebase.xincr))
+        if shift > 0: #Sliding minimum/maximum over +/- shift points (edges repeat the first and last points).
+            lower = sliding_window_view(np.pad(lower, ((0, 0), (shift, shift)), mode='edge'), 2*shift + 1, axis=-1).min(axis=-1)
+            upper = sliding_window_view(np.pad(upper, ((0, 0), (shift, shift)), mode='edge'), 2*shift + 1, axis=-1).max(axis=-1)
+        return cls(channels, outward_float32(lower - voltage_tolerance, -np.inf), outward_float32(upper + voltage_tolerance, np.inf), timebase)
+
+    def check_shape(self, n_channels: int, n_points: int):
+        if (n_channels, n_points) != self.lower.shape:
+            raise Exception(f"Capture with {n_channels} channels of {n_points} points does not match the mask ({self.lower.shape[0]} channels {self.channels} of {self.lower.shape[1]} points)!")
+
+    def test(self, waves) -> dict: #Volts (..., channels, points). Violations, first violation index (-1: none) of each wave and pass/fail of each capture.
+        waves = np.asarray(waves)
+        self.check_shape(*waves.shape[-2:])
+        return mask_results((waves < self.lower) | (waves > self.upper))
+
+    def test_codes(self, codes, preambles: list) -> dict: #Same test on the raw curve codes (no scaling): the envelope is converted to codes once per vertical setup.
+        codes = np.asarray(codes)
+        self.check_shape(*codes.shape[-2:])
+        key = tuple((preamble.ymult, preamble.yoff, preamble.yzero) for preamble in preambles)
+        if key != self.codes_key:
+            (ymult, yoff, yzero) = (np.array(values, dtype='double')[:, np.newaxis] for values in zip(*key))
+            limits = np.sort(np.stack(((self.lower - yzero) / ymult + yoff, (self.upper - yzero) / ymult + yoff)), axis=0) #Negative ymult swaps the limits.
+            self.codes_limits = (np.ceil(limits[0]).astype(np.int32), np.floor(limits[1]).astype(np.int32))
+            self.codes_key = key
+        return mask_results((codes < self.codes_limits[0]) | (codes > self.codes_limits[1]))
+
+    def save(self, file_path):
+        np.savez_compressed(file_path, channels=np.array(self.channels, dtype=int), lower=self.lower, upper=self.upper,
+                            timebase=np.array([self.timebase.t_start, self.timebase.xincr, self.timebase.n], dtype='double'))
+
+def outward_float32(limit, direction: float): #Limit stored as float32, rounded away from the envelope (float64 captures of the reference must still pass).
+    stored = np.asarray(limit).astype('float32')
+    inside = (stored.astype('double') - np.asarray(limit, dtype='double')) * np.sign(direction) < 0
+    return np.where(inside, np.nextafter(stored, np.float32(direction)), stored)
+
+def mask_results(outside) -> dict:
+    violations = outside.sum(axis=-1)
+    return {'passed': ~(violations.any(axis=-1)), 'violations': violations, 'first_violation': first_index(outside)}
+
+def load_mask(file_path) -> WaveformMask:
+    with np.load(file_path) as archive:
+        (t_start, xincr, n) = archive['timebase']
+        return WaveformMask(archive['channels'].tolist(), archive['lower'], archive['upper'], Timebase(t_start, xincr, int(n)))
+
+# Mask test of each capture of streaming and batch acquisitions (raw codes, before they are written).
+class mask_screening():
+    def inline_mask_test(self, codes, preambles: list): #Results of the active mask, or None if there is no active mask or the inline test is disabled.
+        mask = getattr(self, 'mask', None)
+        if mask is None or not int(self.mask_inline_test):
+            return None
+        return mask.test_codes(codes, preambles)
+
+    def print_mask_summary(self, results: dict): #Pass/fail count and the first failed captures with their violations.
+        passed = np.atleast_1d(results['passed'])
+        failed = np.flatnonzero(~passed)
+        if not failed.size:
+            print_green(f"Mask test: {passed.size} of {passed.size} captures passed.")
+            return
+        print_red(f"Mask test: {failed.size} of {passed.size} captures failed!")
+        violations = np.reshape(results['violations'], (passed.size, -1))
+        first_violation = np.reshape(results['first_violation'], (passed.size, -1))
+        for capture in failed[:MASK_PRINTED_FAILURES]:
+            for (index, channel) in enumerate(self.mask.channels):
+                if violations[capture, index]:
+                    print_yellow(f"  Capture {capture}: CH{channel} with {violations[capture, index]} points out of the mask (first at point {first_violation[capture, index]}).")
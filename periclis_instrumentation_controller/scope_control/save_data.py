@@ -26,57 +26,94 @@ from periclis_instrumentation_controller.utils.data_conversion import *
 from periclis_instrumentation_controller.scope_control.scope_reader import *
 from periclis_instrumentation_controller.scope_control.device_specific_commands import *
 from periclis_instrumentation_controller.scope_control.controller_config import *
+from periclis_instrumentation_controller.scope_control.capture_file import save_capture_file
+
+CSV_CHUNK_ROWS = 50000 #Rows formatted and written at once when saving the captures.
+CSV_REPEATED_VALUES = 4 #Columns with at least 4 rows per distinct value are formatted through a table of the distinct values.
+
+def round_columns(data, decimal_places: list): #The floats of round(value, places) for every value of the columns: rint of the scaled values, with round() only near the ties.
+    places = np.asarray(decimal_places, dtype=np.intp)
+    scaled = data * 10.0**places
+    rounded = np.rint(scaled) / 10.0**places
+    with np.errstate(invalid='ignore'):
+        doubtful = ~(np.abs(scaled - np.floor(scaled) - 0.5) > 2*np.abs(np.spacing(scaled))) | (np.abs(scaled) >= 2.0**52) | (places > 22) #Scaling error could change the rounding, or 10**places is not exact.
+    for (row, column) in zip(*np.nonzero(doubtful)):
+        rounded[row, column] = round(float(data[row, column]), int(places[column]))
+    return rounded
+
+def csv_columns(rounded): #Texts (repr) of each column. Columns with few distinct values (volts come from the 8/16-bit codes) get the repr of each value only once.
+    columns = []
+    for column in rounded.T:
+        (values, inverse) = np.unique(column.view(np.int64), return_inverse=True) #Bit patterns: -0.0 and 0.0 are written differently.
+        if values.size * CSV_REPEATED_VALUES <= column.size:
+            columns.append(np.array([repr(value) for value in values.view('double').tolist()], dtype=object)[inverse].tolist())
+        else:
+            columns.append(list(map(repr, column.tolist())))
+    return columns
+
+def write_array_csv(file_path, data, header: list, decimal_places: list): #Writes a 2-D array (one column per header name) rounding each column to its decimal places, with the numbers of round() (e.g. 1.0, 0.25, 1.5e-05).
+    with open(file_path, 'w', newline='') as csvfile:
+        csvfile.write(','.join(header) + '\r\n')
+        for start in range(0, len(data), CSV_CHUNK_ROWS):
+            rows = zip(*csv_columns(round_columns(data[start:start+CSV_CHUNK_ROWS], decimal_places)))
+            csvfile.write('\r\n'.join(map(','.join, rows)) + '\r\n')
 
 class save_data():      
     def store_data(self): #Manages other methods to store data.
-        print("Data is being saved on a figure and a csv file...")
+        print(f"Data is being saved on a figure and a {self.storage_format} file...")
         self.plot_parameters()
         self.date_seconds()
-        self.save_csv()
+        if self.storage_format != ACCEPTED_STORAGE_FORMATS.npz:
+            self.save_csv()
+        if self.storage_format != ACCEPTED_STORAGE_FORMATS.csv:
+            self.save_capture()
         self.plot_configurations()  
         
-    def plot_parameters(self):  
-        channel_label = f"Voltage CH{self.channel_std_trigger} (V)"
+    def plot_parameters(self):  #All channels are plotted at once from the capture array.
+        labels = [f"Voltage CH{channel} (V)" for channel in self.capture.channels]
+        colors = ['b'] + [channel_color_selector(channel) for channel in self.capture.channels[1:]]
         if self.trigger_use: #Case that the voltage measured is from an activated trigger.
-            channel_label =  'Scope Triggered ' + channel_label 
-        self.min_scale_time=min(self.scaled_time)
-        self.max_scale_time=max(self.scaled_time)        
+            labels[0] =  'Scope Triggered ' + labels[0]
+        self.min_scale_time=self.capture.timebase.min()
+        self.max_scale_time=self.capture.timebase.max()
+        self.time_values=self.capture.timebase.values() #Time array only built for plotting and exporting.
         self.fig, self.ax = plt.subplots()
-        self.ax.plot(self.scaled_time, self.scaled_wave, label= channel_label, color='b') 
-        self.plot_new_channels()    
-    
-    def plot_new_channels(self):                
-        for voltage_new_channels in self.list_scaled_wave_other_channels:
-            channel_label = f"Voltage CH{voltage_new_channels.replace("scaled_wave", "")} (V)"
-            channel_color = channel_color_selector(int(voltage_new_channels.replace("scaled_wave", "")))
-            self.ax.plot(self.scaled_time, getattr(self, voltage_new_channels), label=channel_label, color=channel_color) 
+        for line, label, color in zip(self.ax.plot(self.time_values, self.capture.data.T), labels, colors):
+            line.set_label(label)
+            line.set_color(color)
+        if self.capture.envelope is not None: #Band between the minimum and maximum of the averaged captures.
+            for minimum, maximum, color in zip(*self.capture.envelope, colors):
+                self.ax.fill_between(self.time_values, minimum, maximum, color=color, alpha=0.25, linewidth=0)
 
     def date_seconds(self): #Date until seconds.    
+        self.timestamp=datetime.datetime.now().isoformat()
         self.hour=datetime.datetime.now().isoformat(timespec='hours') #Date with hour.
         self.minutes=datetime.datetime.now().minute
         self.seconds=datetime.datetime.now().second
         self.dt=str(self.hour)+'-'+str(self.minutes)+'-'+str(self.seconds) #Date with seconds, but without ":" character so that it can be used to save images.
 
     def save_csv(self):
-        data=[]        
         self.defining_header_csv()
-        data.append(self.header)
-        for number in range(len(self.scaled_time)):
-            list=[]
-            list.append(round(self.scaled_time[number], int(self.rounding_places_time_acquisition)))
-            list.append(round(self.scaled_wave[number], int(self.rounding_places_voltage_acquisition)))
-            for voltage_new_channels in self.list_scaled_wave_other_channels:
-                list.append(round(float((getattr(self, voltage_new_channels))[number]), int(self.rounding_places_voltage_acquisition)))
-            data.append(list)
-        write_file(data, Path(TRIGGER_THRESHOLD_DATA_DIR/f"Scope_Data{self.dt}{DATA_FORMAT}"), '.csv', self.header) #Saving the data with the date, so that old plots aren't overwritten. 
+        columns = (self.time_values, self.capture.data) if self.capture.envelope is None else (self.time_values, self.capture.data, *self.capture.envelope)
+        decimal_places = [int(self.rounding_places_time_acquisition)] + [int(self.rounding_places_voltage_acquisition)]*(len(self.header) - 1)
+        write_array_csv(Path(TRIGGER_THRESHOLD_DATA_DIR/f"Scope_Data{self.dt}{DATA_FORMAT}"), np.vstack(columns).T, self.header, decimal_places) #Saving the data with the date, so that old plots aren't overwritten. 
+
+    def save_capture(self): #Raw codes of every channel, with the preambles needed to rebuild time and volts (see capture_file.load_capture_file). Averaged captures save their volts instead.
+        CAPTURE_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        metadata = {'timestamp': self.timestamp, 'triggered': self.capture.triggered, 'trigger_channel': self.capture.channels[0], 'averages': self.capture.averages}
+        save_capture_file(Path(CAPTURE_DATA_DIR/f"Scope_Capture{self.dt}{CAPTURE_FORMAT}"), self.capture.channels, self.capture.codes,
+                          self.capture.preambles, self.capture.trigger_level, metadata, envelope=self.capture.envelope,
+                          volts=self.capture.data if self.capture.codes is None else None) #Saving the data with the date, so that old captures aren't overwritten.
 
     def defining_header_csv(self):
         voltage_csv_title = 'voltage_ch'
         if self.trigger_use: #Case that the voltage measured is from an activated trigger.
             voltage_csv_title = 'triggered_' + voltage_csv_title
-        self.header = ['time', voltage_csv_title+str(self.channel_std_trigger)]
-        for channel in self.new_channels:
+        self.header = ['time', voltage_csv_title+str(self.capture.channels[0])]
+        for channel in self.capture.channels[1:]:
             self.header.append('voltage_ch'+str(channel))
+        if self.capture.envelope is not None:
+            self.header += [f"minimum_ch{channel}" for channel in self.capture.channels] + [f"maximum_ch{channel}" for channel in self.capture.channels]
         
     def plot_configurations(self): 
         self.trigger_identification()       
@@ -90,10 +127,43 @@ class save_data():
         plt.savefig(TRIGGER_THRESHOLD_PLOT_DIR/f"Scope_Plot{self.dt}{FIGURE_FORMAT}") #Saving the figure with the date, so that old plots aren't overwritten. 
         plt.show()
 
+    def save_spectrum_plot(self, frequencies, magnitudes, channels: list): #Magnitude spectrum (dBV) of each channel, saved without blocking (used in characterization loops).
+        fig, ax = plt.subplots()
+        for (magnitude, channel) in zip(magnitudes, channels):
+            ax.plot(frequencies, magnitude, label=f"CH{channel}", color=channel_color_selector(channel) if channel != channels[0] else 'b', linewidth=0.8)
+        ax.set_xscale('log')
+        ax.legend(loc="upper right")
+        ax.set_title(f"Magnitude spectrum ({self.spectrum_window} window)")
+        ax.set_xlabel('Frequency (Hz)')
+        ax.set_ylabel('Magnitude (dBV)')
+        self.date_seconds()
+        TRIGGER_THRESHOLD_PLOT_DIR.mkdir(parents=True, exist_ok=True)
+        file_path = TRIGGER_THRESHOLD_PLOT_DIR/f"Scope_Spectrum{self.dt}{FIGURE_FORMAT}"
+        fig.savefig(file_path)
+        plt.close(fig)
+        print_green(f"Spectrum saved in {file_path}.")
+
+    def save_histogram_plot(self, name: str, histograms: dict, channels: list, x_label: str): #One row of histograms per channel ({title: (counts (channels, bins), edges (channels, bins+1))}), saved without blocking.
+        fig, axes = plt.subplots(len(channels), len(histograms), squeeze=False, figsize=(4*len(histograms), 3*len(channels)))
+        for (column, (title, (counts, edges))) in enumerate(histograms.items()):
+            for (row, channel) in enumerate(channels):
+                axes[row, column].stairs(counts[row], edges[row], fill=True, color='b' if row == 0 else channel_color_selector(channel))
+                axes[row, column].set_title(f"{title} CH{channel}")
+                axes[row, column].set_xlabel(x_label)
+        fig.tight_layout()
+        self.date_seconds()
+        TRIGGER_THRESHOLD_PLOT_DIR.mkdir(parents=True, exist_ok=True)
+        file_path = TRIGGER_THRESHOLD_PLOT_DIR/f"Scope_{name}{self.dt}{FIGURE_FORMAT}"
+        fig.savefig(file_path)
+        plt.close(fig)
+        print_green(f"Histograms saved in {file_path}.")
+
     def trigger_identification(self):
         if self.trigger_use:
-            self.ax.hlines(y=self.trigger_current_threshold, xmin=self.min_scale_time, xmax=self.max_scale_time, label='Threshold Voltage(V)', color='r', linestyles='--')  #Minimal and Maximal (Volts) values of y-axis in plot.      
+            self.ax.hlines(y=self.capture.trigger_level, xmin=self.min_scale_time, xmax=self.max_scale_time, label='Threshold Voltage(V)', color='r', linestyles='--')  #Minimal and Maximal (Volts) values of y-axis in plot.      
             self.fig_title = 'Voltage of trigger activation'
         else:
             self.fig_title = 'Current Voltage'
+        if self.capture.averages > 1:
+            self.fig_title += f" ({self.averaging_mode} of {self.capture.averages} captures)"
     
\ No newline at end of file
@@ -0,0 +1,97 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file scope_capture.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import numpy as np # http://www.numpy.org
+
+# Uniform time axis of a capture, described by its first time, interval and number of points (the array is only built when needed).
+class Timebase():
+    __slots__ = ('t_start', 'xincr', 'n')
+
+    def __init__(self, t_start: float, xincr: float, n: int) -> None:
+        self.t_start = float(t_start) # seconds, relative to the trigger.
+        self.xincr = float(xincr) # seconds / point.
+        self.n = int(n)
+
+    @classmethod
+    def from_preamble(cls, preamble):
+        return cls((-preamble.pt_off * preamble.xincr) + preamble.xzero, preamble.xincr, preamble.nr_pt)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index): #Time of one point, or the Timebase of a slice of the points.
+        if isinstance(index, slice):
+            (start, stop, step) = index.indices(self.n)
+            return Timebase(self.t_start + start*self.xincr, step*self.xincr, len(range(start, stop, step)))
+        index = int(index)
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError(f"Point {index} out of the timebase with {self.n} points.")
+        return self.t_start + index*self.xincr
+
+    def __array__(self, dtype=None, copy=None):
+        return self.values(dtype)
+
+    def __repr__(self):
+        return f"Timebase(t_start={self.t_start}, xincr={self.xincr}, n={self.n})"
+
+    def values(self, dtype=None): #Materializes the time array (seconds).
+        return (self.t_start + np.arange(self.n, dtype='double')*self.xincr).astype(dtype or 'double', copy=False)
+
+    def min(self):
+        return min(self[0], self[-1])
+
+    def max(self):
+        return max(self[0], self[-1])
+
+# Channels acquired together: volts of every channel in one (n_channels, n_points) array, sharing the same timebase.
+class ScopeCapture():
+    __slots__ = ('data', 'channels', 'preambles', 'codes', 'timebase', 'trigger_level', 'triggered', 'timestamp', 'envelope', 'averages')
+
+    def __init__(self, data, channels: list, preambles: list, codes: list, timebase: Timebase, trigger_level: float, triggered: bool, timestamp: float = None,
+                 envelope: tuple = None, averages: int = 1) -> None:
+        self.data = data # volts, one row per channel.
+        self.channels = [int(channel) for channel in channels] # first channel is the trigger (or monitored) channel.
+        self.preambles = preambles
+        self.codes = codes # raw curve? codes of each channel (views of the received buffers). None for averaged captures (their volts are not codes).
+        self.timebase = timebase
+        self.trigger_level = trigger_level
+        self.triggered = triggered
+        self.timestamp = timestamp
+        self.envelope = envelope # (minimum, maximum) volts of each point among the averaged captures, or None.
+        self.averages = averages # captures averaged in data.
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    @property
+    def n_channels(self):
+        return self.data.shape[0]
+
+    def channel_index(self, channel: int):
+        if int(channel) not in self.channels:
+            raise Exception(f"Channel {channel} was not acquired. Acquired channels: {self.channels}.")
+        return self.channels.index(int(channel))
+
+    def wave(self, channel: int): #Volts of one channel (view of the capture array).
+        return self.data[self.channel_index(channel)]
+
+    def limits(self): #Minimum and maximum volts among every channel (and its envelope).
+        if self.envelope is not None:
+            return (float(self.envelope[0].min()), float(self.envelope[1].max()))
+        return (float(self.data.min()), float(self.data.max()))
@@ -22,32 +22,41 @@ from periclis_instrumentation_controller.utils.file_parsing import *
 from periclis_instrumentation_controller.utils.decorators import get_services
 from periclis_instrumentation_controller.utils.args_handling import check_if_visa_name
 from periclis_instrumentation_controller.utils.color_handling import *
-import pyvisa as visa
+from periclis_instrumentation_controller.resource_manager.resource_manager import PeriCLIsResourceManager
 
 import logging 
 
 class scope_controller(ScopeReader, ScopeWriter):
     # Get resource from visa resource manager
-    def __init__(self, resource=None): 
-        self.rm = visa.ResourceManager()
+    def __init__(self, resource=None, resource_manager=None): 
+        self.own_resource_manager = resource_manager is None #Standalone use: the controller opens (and closes) its own resource manager.
+        self.rm = PeriCLIsResourceManager() if self.own_resource_manager else resource_manager
+        self.resource = resource
          # For the cases that the resources are VISA IDs.
         if resource != None and not check_if_visa_name(resource):
             logging.exception("Not Valid Visa ID")
             raise Exception("Not Valid Visa ID")
 
-        self.scope_generator = self.rm.open_resource(resource) 
+        self.scope_generator = self.rm.open_session(resource) #Session of the pool, still open if the resource was used before.
         convert_list_variables(self, (RESOURCE_DIR), (FILE_NAME + INPUT_FORMAT), '.csv') #Convert variables from the configuration.csv file to Python variables. 
         self.scope_generator.timeout = (float(self.standard_timeout))*1000 #Sets the initial timeout.
         ScopeReader.__init__(self, self.scope_generator)
         ScopeWriter.__init__(self, self.scope_generator)
+        self.capabilities = self.rm.resource_capabilities(resource)
+        for name in CAPABILITY_ATTRIBUTES: #Capabilities already probed on this session.
+            if name in self.capabilities:
+                setattr(self, name, self.capabilities[name])
         print_blue("Variables used for changing the parameter values will be rounded according to the decimal places defined in the data/scope_config.csv file.")
 
     def list_services(self) -> dict:
         return get_services(controler_name='ScopeController')
     
     def disconnect(self):
-        self.scope_generator.close()
-        self.rm.close()
+        self.capabilities.update({name: getattr(self, name) for name in CAPABILITY_ATTRIBUTES if getattr(self, name, None) is not None})
+        self.command_batch.flush()
+        self.rm.release_session(self.resource) #Kept warm for the next connection to the scope.
+        if self.own_resource_manager:
+            self.rm.close()
 
    
         
\ No newline at end of file
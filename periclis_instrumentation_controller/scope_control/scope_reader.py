@@ -15,9 +15,21 @@
 # @date 24/04/2024
 ###############################################################################
 
+import numpy as np # http://www.numpy.org
+from concurrent.futures import Future
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_job
+
 from periclis_instrumentation_controller.utils.decorators import service_add
-from periclis_instrumentation_controller.scope_control.device_specific_commands import QUERY_COMMANDS, READ_SCALE_CURVE_GENERATOR
+from periclis_instrumentation_controller.scope_control.device_specific_commands import QUERY_COMMANDS, READ_SCALE_CURVE_GENERATOR, READ_ACQUISITION
 from periclis_instrumentation_controller.scope_control.acquisitions_configurations import acquisitions_configurations
+from periclis_instrumentation_controller.scope_control.capture_file import load_capture_file, find_capture_file
+from periclis_instrumentation_controller.scope_control.curve_transfer import codes_datatype, transfer_statistics, benchmark_chunk_sizes, TRANSFER_STATISTICS
+from periclis_instrumentation_controller.scope_control.waveform_measurements import measure_waves, measurements_by_channel, MEASUREMENT_UNITS
+from periclis_instrumentation_controller.scope_control.spectrum_analysis import analyse_spectrum, magnitude_spectrum, spectrum_units
+from periclis_instrumentation_controller.scope_control.eye_diagram import EYE_UNITS
+from periclis_instrumentation_controller.scope_control.edge_timing import jitter_analysis, channel_histograms, JITTER_UNITS
+from periclis_instrumentation_controller.scope_control.channel_delay import correlation_delay, delay_statistics, delay_histogram, DELAY_UNITS
+from periclis_instrumentation_controller.scope_control.mask_test import WaveformMask, load_mask, MASK_DATA_DIR
 from periclis_instrumentation_controller.scope_control.controller_config import *
 from periclis_instrumentation_controller.utils.errors_handling import *
 from periclis_instrumentation_controller.utils.color_handling import *
@@ -33,8 +45,17 @@ class ScopeReader(acquisitions_configurations):
     def __init__(self, scope_generator) -> None:
         self.scope_generator = scope_generator
         
-    def _query(self, query_string : str):
-        return self.scope_generator.query(query_string)
+    @instrument_job
+    def _query(self, query_string : str): #Runs on the scope worker (blocking). Settings read less than state_cache_ttl seconds ago (and not written since) are answered by the state shadow.
+        answer = self.instrument_state.cached_answer(query_string, float(self.state_cache_ttl))
+        if answer is None:
+            self.command_batch.flush() #Queued writes are sent before the query.
+            answer = self.scope_generator.query(query_string)
+            self.instrument_state.store_answer(query_string, answer)
+        return answer
+
+    def query_future(self, query_string : str) -> Future: #_query queued on the scope worker, after the jobs already queued: returns at once, the future gets the answer.
+        return self.instrument_worker.submit(self._query, query_string)
     
     @service
     def read_default_configurations(self):
@@ -109,6 +130,29 @@ class ScopeReader(acquisitions_configurations):
         result = str(float(self.scope_generator.timeout)/1000)
         print_green(result)
     
+    @service
+    def read_transfer_statistics(self): #Binary transfers of each resource since the CLI started.
+        for (resource, statistics) in TRANSFER_STATISTICS.items():
+            throughput = f"{statistics.throughput/1e6:.2f} MB/s" if statistics.throughput else "not measured"
+            print(get_blue(f"{resource}:"), get_blue("Blocks:"), get_green(str(statistics.transfers)), get_blue("MB:"), get_green(f"{statistics.bytes/1e6:.2f}"),
+                  get_blue("Throughput:"), get_green(throughput), get_blue("Chunk size:"), get_green(f"{statistics.chunk_size//1024} KiB" if statistics.chunk_size else "block length"))
+
+    @service
+    def benchmark_transfer(self, repetitions=3): #Transfers the record of the trigger channel with each chunk size and keeps the fastest one for this scope.
+        repetitions = first_list_argument(repetitions, 0)
+        error_non_positive(repetitions, "benchmark_transfer", "repetitions", 0) #Checks if the argument is non positive.
+        repetitions = int(repetitions)
+        channel = int(self.channel_std_trigger)
+        self.setting_acquisition(channel)
+        preamble = self.read_preamble(channel)
+        print_blue(f"Transferring {preamble.nr_pt} points x {preamble.byt_nr} bytes of CH{channel} {repetitions} times with each chunk size...")
+        rates = benchmark_chunk_sizes(self.scope_generator, READ_ACQUISITION.read_curve, 1, codes_datatype(preamble), repetitions)
+        for (chunk_size, rate) in rates.items():
+            print(get_blue(f"  {chunk_size//1024} KiB:"), get_green(f"{rate/1e6:.2f} MB/s"))
+        statistics = transfer_statistics(self.scope_generator)
+        statistics.chunk_size = max(rates, key=rates.get)
+        print_green(f"Chunk size of {statistics.chunk_size//1024} KiB kept for the transfers of this scope.")
+
     @service    
     def read_probe_gain(self, channel:int=1): #Reads the probe constant gain that multiplies the value read.
         channel = check_channels(channel, self.standard_channel) #Correct channel for its correct value.  
@@ -174,9 +218,178 @@ class ScopeReader(acquisitions_configurations):
         channel = check_channels(channel, self.standard_channel) #Correct channel for its correct value. 
         self.trigger_use = False #Variable for not plot with threshold.
         acquisitions_configurations.__init__(self, False, 1, 1, channel)
-        result = str((sum(self.scaled_wave) / len(self.scaled_wave)))
+        result = str(np.mean(self.capture.data[0])) #Monitored channel is the first of the capture.
         print_green("Voltage (Volts): " + result)
 
+    @service
+    def stream_acquisition(self, args=0): #Back-to-back captures saved as .npz batches, until the number of captures, the duration (s) or Ctrl+C.
+        arguments = args if isinstance(args, list) else [args]
+        captures = first_list_argument(arguments[0], 0)
+        duration = first_list_argument(arguments[1], int(self.rounding_places)) if len(arguments) > 1 else 0
+        error_negative(captures, "stream_acquisition", "captures", 0) #Checks if the argument is negative.
+        error_negative(duration, "stream_acquisition", "duration", int(self.rounding_places))
+        self.trigger_use = True
+        self.possible_new_channels = [self.add_channel_trigger_plot_1, self.add_channel_trigger_plot_2, self.add_channel_trigger_plot_3]
+        self.initial_configuirations(1)
+        self.add_new_channels(self.possible_new_channels, 1)
+        self.stream_manager(int(captures), float(duration))
+
+    @service
+    def batch_capture(self, segments=100): #Captures the number of trigger events (segments) and saves them in a single .npz file.
+        segments = first_list_argument(segments, 0)
+        error_non_positive(segments, "batch_capture", "segments", 0) #Checks if the argument is non positive.
+        self.trigger_use = True
+        self.possible_new_channels = [self.add_channel_trigger_plot_1, self.add_channel_trigger_plot_2, self.add_channel_trigger_plot_3]
+        self.initial_configuirations(1)
+        self.add_new_channels(self.possible_new_channels, 1)
+        self.batch_manager(int(segments))
+
+    @service
+    def average_capture(self, captures=None): #Averages the number of captures in software (averaging_mode) and stores the result as a normal capture.
+        captures = int(self.averaging_count) if captures is None else first_list_argument(captures, 0)
+        error_non_positive(captures, "average_capture", "captures", 0) #Checks if the argument is non positive.
+        self.trigger_use = True
+        self.possible_new_channels = [self.add_channel_trigger_plot_1, self.add_channel_trigger_plot_2, self.add_channel_trigger_plot_3]
+        self.initial_configuirations(1)
+        self.add_new_channels(self.possible_new_channels, 1)
+        self.averaging_manager(int(captures))
+
+    @service
+    def measure_capture(self, file_name=None): #Measurements of every channel of the last capture, or of a saved .npz capture (mean and deviation among the segments of batches).
+        self.print_analysis(self.capture_measurements(file_name), MEASUREMENT_UNITS.get)
+
+    def capture_measurements(self, file_name=None) -> dict: #{'CH1': {'mean': value...}} of the last capture (file_name None) or of a file of CAPTURE_DATA_DIR.
+        (waves, timebase, channels, _) = self.analysis_waves(file_name)
+        return measurements_by_channel(measure_waves(waves, timebase.xincr), channels)
+
+    @service
+    def spectrum_analysis(self, file_name=None): #Magnitude spectrum (saved figure), fundamental, harmonics, THD, SFDR, SNR, SINAD and ENOB of every channel of the last capture, or of a saved .npz capture.
+        (waves, timebase, channels, _) = self.analysis_waves(file_name)
+        self.print_analysis(measurements_by_channel(analyse_spectrum(waves, timebase.xincr, self.spectrum_window, int(self.spectrum_harmonics)), channels), spectrum_units)
+        (frequencies, magnitudes) = magnitude_spectrum(waves, timebase.xincr, self.spectrum_window)
+        self.save_spectrum_plot(frequencies, magnitudes.reshape(-1, len(channels), len(frequencies)).mean(axis=0), channels) #Segments of batches are averaged.
+
+    @service
+    def eye_diagram(self, args): #Folds captures of a PRBS stimulus modulo the bit period into a persistence histogram (saved figure), with eye height and width.
+        arguments = args if isinstance(args, list) else [args]
+        bit_rate = first_list_argument(arguments[0], 0)
+        captures = first_list_argument(arguments[1], 0) if len(arguments) > 1 else 100
+        keep = first_list_argument(arguments[2], 0) if len(arguments) > 2 else 0
+        error_non_positive(bit_rate, "eye_diagram", "bit rate", 0) #Checks if the argument is non positive.
+        error_non_positive(captures, "eye_diagram", "captures", 0)
+        error_interval(keep, 0, 1, "eye_diagram", "keep")
+        self.trigger_use = True
+        self.possible_new_channels = [self.add_channel_trigger_plot_1, self.add_channel_trigger_plot_2, self.add_channel_trigger_plot_3]
+        self.initial_configuirations(1)
+        self.add_new_channels(self.possible_new_channels, 1)
+        self.eye_manager(1/float(bit_rate), int(captures), bool(keep))
+        if getattr(self, 'eye', None) is not None:
+            self.print_analysis(self.eye_measurements(), EYE_UNITS.get)
+
+    def eye_measurements(self) -> dict: #{'CH1': {'eye_height': value...}} of the accumulated eye diagram.
+        if getattr(self, 'eye', None) is None:
+            raise Exception("No eye diagram accumulated! Use eye_diagram first.")
+        return measurements_by_channel(self.eye.measurements(), self.eye.channels)
+
+    @service
+    def edge_jitter(self, args=None): #Edge times (sub-sample interpolation), period, cycle-to-cycle and TIE jitter of every channel, with their histograms (saved figure). Args: [file name] [level (V)].
+        (statistics, values, channels) = self.jitter_values(args)
+        self.print_analysis(measurements_by_channel(statistics, channels), JITTER_UNITS.get)
+        histograms = {name: channel_histograms(*values[name], statistics['edges'].size, len(channels), int(self.jitter_histogram_bins)) for name in ('tie', 'periods', 'cycle_to_cycle')}
+        self.save_histogram_plot("Jitter", histograms, channels, 'Time (Seconds)')
+
+    def jitter_values(self, args=None): #Jitter statistics (..., channels), raw values (edge times, TIE, periods...) and channels. Edges of the trigger slope, at the trigger level or at the level given.
+        arguments = [] if args is None else list(args) if isinstance(args, list) else [args]
+        file_name = arguments.pop(0) if arguments and isinstance(arguments[0], str) else None
+        (waves, timebase, channels, level) = self.analysis_waves(file_name)
+        if arguments:
+            error_non_numerical(arguments[0], "edge_jitter", "level", int(self.rounding_places))
+            level = float(first_list_argument(arguments[0], int(self.rounding_places)))
+        (statistics, values) = jitter_analysis(waves, timebase, level, self.slope_std_trigger != 'fall')
+        return (statistics, values, channels)
+
+    @service
+    def channel_delay(self, args): #Delay of a channel relative to a reference channel (FFT cross-correlation), with its histogram over repeated captures. Args: [file name] reference channel, channel, [captures].
+        (delays, reference_channel, channel) = self.delay_values(args)
+        self.print_analysis({f"CH{channel} - CH{reference_channel}": delay_statistics(delays)}, DELAY_UNITS.get)
+        if delays.size > 1:
+            self.save_histogram_plot("Delay", {f"Delay from CH{reference_channel} to": delay_histogram(delays, int(self.jitter_histogram_bins))}, [channel], 'Time (Seconds)')
+
+    def delay_values(self, args): #Delays (s) measured on a saved capture (every segment), on the last capture (captures 0) or on new captures. Returns them with the two channels.
+        arguments = list(args) if isinstance(args, list) else [args]
+        file_name = arguments.pop(0) if isinstance(arguments[0], str) else None
+        if len(arguments) < 2:
+            raise Exception("Give the reference channel and the channel: channel_delay [file name] reference_channel channel [captures].")
+        reference_channel = int(check_channels(arguments[0], self.standard_channel))
+        channel = int(check_channels(arguments[1], self.standard_channel))
+        captures = first_list_argument(arguments[2], 0) if len(arguments) > 2 else 0
+        error_negative(captures, "channel_delay", "captures", 0) #Checks if the argument is negative.
+        if file_name is not None or not captures:
+            (waves, timebase, channels, _) = self.analysis_waves(file_name)
+            indexes = [channels.index(c) if c in channels else None for c in (reference_channel, channel)]
+            if None in indexes:
+                raise Exception(f"Channels CH{reference_channel} and CH{channel} must be in the capture. Captured channels: {channels}.")
+            return (np.atleast_1d(correlation_delay(waves[..., indexes[0], :], waves[..., indexes[1], :], timebase.xincr)).reshape(-1), reference_channel, channel)
+        self.trigger_use = True
+        self.initial_configuirations(1)
+        self.add_new_channels([str(c) for c in (reference_channel, channel) if c != int(self.channel_std_trigger)], 1)
+        delays = self.delay_manager(reference_channel, channel, int(captures))
+        if not delays.size:
+            raise Exception("No capture triggered to measure the delay!")
+        return (delays, reference_channel, channel)
+
+    @service
+    def mask_create(self, args=None): #Tolerance mask (envelope of the capture, or of every segment of a batch) saved in scope_mask and used by mask_test and by the inline tests. Args: [file name] [voltage tolerance (V)] [time tolerance (s)].
+        arguments = [] if args is None else list(args) if isinstance(args, list) else [args]
+        file_name = arguments.pop(0) if arguments and isinstance(arguments[0], str) else None
+        voltage_tolerance = first_list_argument(arguments[0], int(self.rounding_places)) if arguments else float(self.mask_voltage_tolerance)
+        time_tolerance = first_list_argument(arguments[1], 12) if len(arguments) > 1 else float(self.mask_time_tolerance)
+        error_negative(voltage_tolerance, "mask_create", "voltage tolerance", int(self.rounding_places)) #Checks if the argument is negative.
+        error_negative(time_tolerance, "mask_create", "time tolerance", 12)
+        (waves, timebase, channels, _) = self.analysis_waves(file_name)
+        self.mask = WaveformMask.from_waves(waves, channels, timebase, float(voltage_tolerance), float(time_tolerance))
+        MASK_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.date_seconds()
+        file_path = MASK_DATA_DIR/f"Scope_Mask{self.dt}{CAPTURE_FORMAT}"
+        self.mask.save(file_path)
+        print_green(f"Mask of channels {channels} (+/- {voltage_tolerance} V, +/- {time_tolerance} s) saved in {file_path} and activated.")
+
+    @service
+    def mask_load(self, file_name): #Activates a mask saved in scope_mask.
+        self.mask = load_mask(find_capture_file(file_name, MASK_DATA_DIR))
+        print_green(f"Mask of channels {self.mask.channels} ({self.mask.timebase.n} points) activated.")
+
+    @service
+    def mask_test(self, file_name=None): #Tests the last capture, or every segment of a saved .npz capture, against the active mask.
+        self.print_mask_summary(self.capture_mask_test(file_name))
+
+    def capture_mask_test(self, file_name=None) -> dict: #{'passed', 'violations', 'first_violation'} of the last capture or of a saved capture (one value per capture and channel).
+        if getattr(self, 'mask', None) is None:
+            raise Exception("No active mask! Use mask_create or mask_load first.")
+        (waves, _, channels, _) = self.analysis_waves(file_name)
+        if channels != self.mask.channels:
+            raise Exception(f"Capture channels {channels} do not match the mask channels {self.mask.channels}!")
+        return self.mask.test(waves)
+
+    def analysis_waves(self, file_name=None): #Volts (..., channels, points), timebase, channels and trigger level of the last capture or of a saved capture.
+        if file_name is None:
+            if getattr(self, 'capture', None) is None:
+                raise Exception("No capture to analyse! Acquire with use_trigger_mode, or give the name of a file saved in " + str(CAPTURE_DATA_DIR) + ".")
+            return (self.capture.data, self.capture.timebase, self.capture.channels, self.capture.trigger_level)
+        with load_capture_file(find_capture_file(file_name, CAPTURE_DATA_DIR)) as capture_file:
+            return (capture_file.waves(), capture_file.time(), capture_file.channels, capture_file.trigger_level)
+
+    def print_analysis(self, results: dict, unit): #Prints the results of each channel (mean and deviation when there is one value per segment). unit: function that returns the unit of a result.
+        for (channel, values) in results.items():
+            print_blue(channel + ":")
+            for (name, value) in values.items():
+                if np.ndim(value):
+                    valid = value[~np.isnan(value)] #Segments where the result could be computed.
+                    statistics = f"{valid.mean():.6g} ± {valid.std():.3g}" if valid.size else "nan"
+                    print(get_blue(f"  {name}:"), get_green(f"{statistics} {unit(name)}"), get_blue(f"({valid.size} of {value.size} segments)"))
+                else:
+                    print(get_blue(f"  {name}:"), get_green(f"{value:.6g} {unit(name)}"))
+
     
 
 
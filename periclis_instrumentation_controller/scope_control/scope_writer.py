@@ -15,14 +15,19 @@
 # @author Eric Sonagli Abbade.
 # @date 24/04/2024
 ###############################################################################
-from periclis_instrumentation_controller.scope_control.device_specific_commands import WRITE_COMMANDS, QUERY_COMMANDS, ACCEPTED_TRIGGER_TYPES, ACCEPTED_CHANNELS, ACCEPTED_TRIGGER_COUPLING, ACCEPTED_TRIGGER_SLOPE
+from periclis_instrumentation_controller.scope_control.device_specific_commands import WRITE_COMMANDS, QUERY_COMMANDS, WRITE_ACQUISITION, ERROR_COMMANDS, ACCEPTED_TRIGGER_TYPES, ACCEPTED_CHANNELS, ACCEPTED_TRIGGER_COUPLING, ACCEPTED_TRIGGER_SLOPE, ACCEPTED_RECORD_LENGTHS
 from periclis_instrumentation_controller.scope_control.services_metainfo import SERVICES_METAINFO
 from periclis_instrumentation_controller.scope_control.acquisitions_configurations import acquisitions_configurations
+from periclis_instrumentation_controller.scope_control.waveform_preamble import preamble_cache
+from periclis_instrumentation_controller.scope_control.instrument_state import instrument_state
 from periclis_instrumentation_controller.scope_control.controller_config import *
 from periclis_instrumentation_controller.utils.decorators import service_add
+from periclis_instrumentation_controller.utils.command_batching import CommandBatch
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_worker, instrument_job
+from concurrent.futures import Future
+from contextlib import contextmanager
 from periclis_instrumentation_controller.utils.errors_handling import *
 from periclis_instrumentation_controller.utils.file_parsing import *
-import time
 
 # A decorator facilitating listing services boilerplate
 service = service_add(controller_name=CONTROLLER_NAME, 
@@ -31,15 +36,47 @@ service = service_add(controller_name=CONTROLLER_NAME,
 class ScopeWriter(acquisitions_configurations):
     def __init__(self, scope_generator) -> None:
         self.scope_generator = scope_generator
+        self.preamble_cache = preamble_cache()
+        self.command_batch = CommandBatch(self.scope_generator, self.command_buffer_size, ERROR_COMMANDS.read_error, ERROR_COMMANDS.no_error_codes, ERROR_COMMANDS.read_event_status, ERROR_COMMANDS.error_codes)
+        self.instrument_state = instrument_state(self.scope_generator)
+        self.instrument_worker = instrument_worker(self.scope_generator) #Thread that runs the SCPI traffic of the scope, in order.
         
-    def _write(self, scope_command : str):
-        self.scope_generator.write(scope_command)
+    @instrument_job
+    def _write(self, scope_command : str): #Runs on the scope worker (blocking): the shadow of the settings and the preamble cache are only changed by jobs of the worker.
+        if self.instrument_state.unchanged(scope_command, float(self.state_cache_ttl)): #Same value written less than state_cache_ttl seconds ago.
+            return
+        self.preamble_cache.invalidate_for(scope_command) #Scale, record length and probe changes make the cached preambles obsolete.
+        self.command_batch.write(scope_command)
+        self.instrument_state.store_write(scope_command)
+
+    def write_future(self, scope_command : str) -> Future: #_write queued on the scope worker: returns at once (other instruments and the CLI go on), the future is done once the command is sent.
+        return self.instrument_worker.submit(self._write, scope_command)
+
+    @contextmanager
+    def batched_writes(self, check_errors: bool = True): #with self.batched_writes(): the writes are sent together (up to command_buffer_size characters per message) when the block ends.
+        self.command_batch.buffer_size = int(self.command_buffer_size)
+        try:
+            with self.command_batch.batch(check_errors):
+                yield
+        except Exception:
+            self.instrument_worker.run(self.instrument_state.invalidate) #Some of the batched writes may have been refused.
+            raise
+
+    @service
+    def clear_state_cache(self): #Forgets the settings written and read (use it after changing the scope on its front panel).
+        self.instrument_worker.run(self.forget_settings)
+
+    def forget_settings(self):
+        self.instrument_state.invalidate()
+        self.preamble_cache.invalidate()
+        self.preamble_cache.trigger_level = None
+        self.preamble_cache.record_timebase = None
 
     @service    
     def autoscale(self):               
         self._write(WRITE_COMMANDS.autoscale)
         print("Wait while autoscale is finished...")
-        time.sleep(float(self.delay_autoscale))
+        self.wait_operation_complete(self.delay_autoscale)
         print("Autoscale time period finished")
     
     @service    
@@ -93,6 +130,15 @@ class ScopeWriter(acquisitions_configurations):
         error_non_positive(scale_x, "change_scale_x", "scale_x", int(self.rounding_places_time_scale)) #Checks if the argument is non positive.
         self._write(WRITE_COMMANDS.change_scale_x.format(scale_x=float(scale_x)/(float(self.squares_x_axis))))
     
+    @service
+    def change_record_length(self, record_length): #Number of points of the record, or a preset (fast, standard, long, maximum).
+        record_length = first_list_argument(record_length)
+        if isinstance(record_length, str):
+            check_list_options(record_length, dir(ACCEPTED_RECORD_LENGTHS), "change_record_length", "record_length")
+            record_length = getattr(ACCEPTED_RECORD_LENGTHS, record_length)
+        error_non_positive(record_length, "change_record_length", "record_length", 0) #Checks if the argument is non positive.
+        self._write(WRITE_ACQUISITION.change_record_length.format(record_length=int(record_length)))
+
     @service    
     def change_y_scale(self, scale_y, channel:int=1): #This parameter equals the total vertical height of the scope (in Volts). 
         try:
@@ -0,0 +1,128 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file segmented_capture.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import re
+import time
+import datetime
+import numpy as np # http://www.numpy.org
+from pathlib import Path
+
+from periclis_instrumentation_controller.utils.color_handling import *
+from periclis_instrumentation_controller.scope_control.controller_config import *
+from periclis_instrumentation_controller.scope_control.curve_transfer import codes_datatype
+from periclis_instrumentation_controller.scope_control.capture_file import save_capture_file
+from periclis_instrumentation_controller.scope_control.device_specific_commands import WRITE_COMMANDS, FASTFRAME_COMMANDS
+
+FRAME_TIMESTAMP_PATTERN = re.compile(r'"?\s*(\d{1,2} \w{3} \d{4} \d{1,2}:\d{2}:\d{2})\.([\d ]+)"?') #'02 Mar 2024 20:11:07.342 432 124 230' (fraction of second in groups of 3 digits).
+
+def parse_frame_timestamps(answer: str): #Converts the FastFrame time stamps answered by the scope to seconds since the epoch.
+    timestamps = []
+    for (date, fraction) in FRAME_TIMESTAMP_PATTERN.findall(answer):
+        seconds = datetime.datetime.strptime(date, '%d %b %Y %H:%M:%S').timestamp()
+        timestamps.append(seconds + float('0.' + fraction.replace(' ', '')))
+    return np.array(timestamps, dtype='double')
+
+# N trigger events captured as one (segments, channels, points) array of codes: FastFrame (scope keeps every segment, single bulk transfer) or re-arm loop.
+class segmented_capture():
+    def batch_manager(self, segments: int):
+        channels = [int(self.channel_std_trigger)] + self.new_channels
+        self.setting_acquisition(self.channel_std_trigger)
+        self.readscale(self.channel_std_trigger)
+        start = time.monotonic()
+        result = None
+        if int(self.segmented_acquisition) and self.fastframe_available():
+            result = self.fastframe_capture(channels, segments)
+        if result is None:
+            result = self.rearm_capture(channels, segments)
+        (codes, timestamps, preambles) = result
+        elapsed = time.monotonic() - start
+        if not len(codes):
+            print_red("No segment captured!")
+            return
+        CAPTURE_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.date_seconds()
+        metadata = {'timestamp': self.timestamp, 'triggered': True, 'trigger_channel': channels[0]}
+        mask_results = self.inline_mask_test(codes, preambles)
+        if mask_results is not None:
+            metadata['mask_passed'] = mask_results['passed'].tolist()
+            self.print_mask_summary(mask_results)
+        self.batch_file = Path(CAPTURE_DATA_DIR/f"Scope_Batch{self.dt}{CAPTURE_FORMAT}")
+        save_capture_file(self.batch_file, channels, codes, preambles, self.trigger_current_threshold, metadata, timestamps)
+        print_green(f"{len(codes)} segments of channels {channels} captured in {elapsed:.2f} s ({len(codes)/elapsed*60:.0f} segments/minute), saved in {self.batch_file}.")
+
+    def fastframe_available(self): #Checked once per connection (scopes without FastFrame do not answer the query).
+        if getattr(self, 'fastframe_supported', None) is None:
+            try:
+                self.fastframe_supported = int(float(self._query(FASTFRAME_COMMANDS.read_max_frames))) > 1
+            except Exception:
+                self.scope_generator.clear()
+                self.fastframe_supported = False
+            if not self.fastframe_supported:
+                print_yellow("Scope without FastFrame (segmented memory). The segments will be captured re-arming the scope.")
+        return self.fastframe_supported
+
+    def fastframe_capture(self, channels: list, segments: int): #Arms the scope once for every segment and transfers them with a single curve? per source.
+        try:
+            self._write(FASTFRAME_COMMANDS.change_count.format(count=segments))
+            self._write(FASTFRAME_COMMANDS.change_state.format(state='ON'))
+            preambles = [self.read_preamble(channel) for channel in channels] #FastFrame changes the preambles.
+            self._write(WRITE_COMMANDS.single)
+            if self.wait_for_trigger_sequence() is None: #Missing trigger: reported instead of re-arming the scope once per segment.
+                print_red(f"Error! FastFrame sequence not finished in {self.trigger_wait_timeout} seconds! Batch stopped.")
+                return (np.empty((0, len(channels), preambles[0].nr_pt)), np.empty(0, dtype='double'), preambles)
+            self._write(FASTFRAME_COMMANDS.change_frame_start.format(frame=1))
+            self._write(FASTFRAME_COMMANDS.change_frame_stop.format(frame=segments))
+            codes = self.stream_transfer(channels, codes_datatype(preambles[0])) #One block with every segment per channel.
+            codes = np.stack([channel_codes.reshape(segments, -1) for channel_codes in codes], axis=1)
+            timestamps = parse_frame_timestamps(self._query(FASTFRAME_COMMANDS.read_timestamps.format(channel=channels[0], count=segments)))
+            if timestamps.size != segments: #Scope answered the time stamps in another format: the end of the sequence is used for every segment.
+                timestamps = np.full(segments, time.time())
+            return (codes, timestamps, preambles)
+        except Exception as error: #Scope rejected the FastFrame commands: the next batches go straight to the re-arm loop.
+            print_yellow(f"FastFrame capture failed ({error}). The segments will be captured re-arming the scope.")
+            self.scope_generator.clear()
+            self.fastframe_supported = False
+            return None
+        finally:
+            self._write(FASTFRAME_COMMANDS.change_state.format(state='OFF'))
+
+    def rearm_capture(self, channels: list, segments: int): #One single sequence per segment, stored on a preallocated array (Ctrl+C keeps the segments already captured).
+        preambles = [self.read_preamble(channel) for channel in channels]
+        datatype = codes_datatype(preambles[0])
+        codes = np.empty((segments, len(channels), preambles[0].nr_pt), dtype=datatype)
+        timestamps = np.empty(segments, dtype='double')
+        captured = 0
+        try:
+            while captured < segments:
+                self._write(WRITE_COMMANDS.single)
+                trigger_time = self.wait_for_trigger_sequence()
+                if trigger_time is None:
+                    print_red(f"Error! Segment {captured+1} not triggered in {self.trigger_wait_timeout} seconds! Batch stopped.")
+                    break
+                timestamps[captured] = trigger_time
+                for row, channel_codes in zip(codes[captured], self.stream_transfer(channels, datatype)):
+                    row[:] = channel_codes
+                captured += 1
+        except KeyboardInterrupt:
+            print_yellow(f"\nBatch interrupted by the user after {captured} segments.")
+        return (codes[:captured], timestamps[:captured], preambles)
+
+    def wait_for_trigger_sequence(self): #Waits the end of the single sequence. Returns its time, or None if trigger_wait_timeout (0: unlimited) expired.
+        timeout = float(self.trigger_wait_timeout) or float('inf')
+        if self.wait_until(self.acquisition_stopped, timeout):
+            return time.time()
+        return None
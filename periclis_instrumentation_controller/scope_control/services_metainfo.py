@@ -46,6 +46,9 @@ SERVICES_METAINFO = {
     "change_x_scale": {
          "args": {'Trigger horizontal scale (value of the scope full screen x-axis in seconds)': None}
        },
+    "change_record_length": {
+         "args": {'Record length in points, or a preset (fast: 1000 / standard: 10000 / long: 100000 / maximum: 1000000 points)': None}
+       },
     "change_y_scale": {
          "args": {'Trigger vertical scale (value of the scope full screen y-axis in Volts)': None}
        },
@@ -55,6 +58,42 @@ SERVICES_METAINFO = {
     "change_configuration": {
          "args": {'configuration_name, configuration_value': None}
        },
+    "stream_acquisition": {
+         "args": {'Number of captures (0: unlimited), Duration in seconds (0: unlimited). Stops with Ctrl+C.': 'Default:(0, 0)'}
+       },
+    "batch_capture": {
+         "args": {'Number of segments (trigger events) captured with FastFrame, or re-arming the scope.': 'Default:(100)'}
+       },
+    "measure_capture": {
+         "args": {'Name of a .npz capture saved in scope_npz (none: last capture).': 'Default:(last capture)'}
+       },
+    "spectrum_analysis": {
+         "args": {'Name of a .npz capture saved in scope_npz (none: last capture).': 'Default:(last capture)'}
+       },
+    "eye_diagram": {
+         "args": {'Bit rate of the PRBS stimulus (bps), Number of captures, Keep the previous eye (0: new eye / 1: accumulate).': 'Default:(bit rate, 100, 0)'}
+       },
+    "edge_jitter": {
+         "args": {'Name of a .npz capture saved in scope_npz (none: last capture), Level of the edges in Volts (none: trigger level).': 'Default:(last capture, trigger level)'}
+       },
+    "channel_delay": {
+         "args": {'Name of a .npz capture saved in scope_npz (optional), Reference channel, Channel, Number of new captures (0: last capture).': 'Default:(none, reference channel, channel, 0)'}
+       },
+    "mask_create": {
+         "args": {'Name of a .npz capture saved in scope_npz (none: last capture), Voltage tolerance (V), Time tolerance (s).': 'Default:(last capture, mask_voltage_tolerance, mask_time_tolerance)'}
+       },
+    "mask_load": {
+         "args": {'Name of a mask saved in scope_mask.': None}
+       },
+    "mask_test": {
+         "args": {'Name of a .npz capture saved in scope_npz (none: last capture).': 'Default:(last capture)'}
+       },
+    "average_capture": {
+         "args": {'Number of captures averaged.': 'Default:(averaging_count)'}
+       },
+    "benchmark_transfer": {
+         "args": {'Number of transfers with each chunk size.': 'Default:(3)'}
+       },
     "use_trigger_mode": {
          "args": {'Configurations (0:scope_config.csv / 1:scope), Scale (0:scope_config.csv / 1:scope / 2:autoscale).': 'Default:(0, 0)'}
        }
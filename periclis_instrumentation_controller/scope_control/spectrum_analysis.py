@@ -0,0 +1,106 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file spectrum_analysis.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+from functools import lru_cache
+import numpy as np # http://www.numpy.org
+
+from periclis_instrumentation_controller.scope_control.device_specific_commands import ACCEPTED_SPECTRUM_WINDOWS
+
+## Spectra of every wave of an array shaped (..., points) computed by a single real FFT along the last axis.
+## The tones (fundamental and harmonics) are the power of the bins of the window main lobe around their peak bin.
+
+WINDOW_COEFFICIENTS = { #Cosine-sum windows: w[k] = a0 - a1*cos(2*pi*k/N) + a2*cos(4*pi*k/N) - ... (main lobe of +/- len(coefficients) bins).
+    ACCEPTED_SPECTRUM_WINDOWS.rectangular: (1.0,),
+    ACCEPTED_SPECTRUM_WINDOWS.hann: (0.5, 0.5),
+    ACCEPTED_SPECTRUM_WINDOWS.blackman: (0.42, 0.5, 0.08),
+    ACCEPTED_SPECTRUM_WINDOWS.blackmanharris: (0.35875, 0.48829, 0.14128, 0.01168),
+}
+SPECTRUM_UNITS = {'fundamental_frequency': 'Hz', 'fundamental_amplitude': 'V', 'thd': 'dBc', 'sfdr': 'dBc', 'snr': 'dB', 'sinad': 'dB', 'enob': 'bits'}
+MAGNITUDE_FLOOR = 1e-15 #Volts of the bins without signal (avoids log10(0)).
+
+@lru_cache(maxsize=16)
+def spectrum_window(n_points: int, window: str): #Periodic window of the record length, computed once and shared (read-only) by every capture.
+    angles = np.arange(n_points) * (2*np.pi/n_points)
+    values = np.zeros(n_points)
+    for (term, coefficient) in enumerate(WINDOW_COEFFICIENTS[window]):
+        values += (-1)**term * coefficient * np.cos(term*angles)
+    values.setflags(write=False)
+    return values
+
+@lru_cache(maxsize=16)
+def frequency_bins(n_points: int, xincr: float): #Frequencies (Hz) of the real FFT bins of the record length.
+    bins = np.fft.rfftfreq(n_points, xincr)
+    bins.setflags(write=False)
+    return bins
+
+def power_spectrum(waves, window: str): #|FFT|^2 of the windowed waves, (..., points//2+1).
+    waves = np.asarray(waves, dtype='double')
+    return np.square(np.abs(np.fft.rfft(waves * spectrum_window(waves.shape[-1], window), axis=-1)))
+
+def magnitude_spectrum(waves, xincr: float, window: str): #Frequencies (Hz) and amplitude of the bins (dBV, peak), corrected by the window gain.
+    waves = np.asarray(waves, dtype='double')
+    window_sum = spectrum_window(waves.shape[-1], window).sum()
+    magnitude = 2 * np.sqrt(power_spectrum(waves, window)) / window_sum
+    return (frequency_bins(waves.shape[-1], float(xincr)), 20*np.log10(np.maximum(magnitude, MAGNITUDE_FLOOR)))
+
+def aliased_bins(bins, n_points: int): #Bin where a frequency above Nyquist appears after sampling.
+    bins = bins % n_points
+    return np.where(bins > n_points//2, n_points - bins, bins)
+
+def lobe_power(cumulative_power, bins, lobe: int): #Power of the bins [bin-lobe, bin+lobe] from the cumulative sum of the spectrum (one leading zero).
+    last = cumulative_power.shape[-1] - 1
+    stop = np.take_along_axis(cumulative_power, np.minimum(bins + lobe + 1, last), axis=-1)
+    start = np.take_along_axis(cumulative_power, np.maximum(bins - lobe, 0), axis=-1)
+    return stop - start
+
+def analyse_spectrum(waves, xincr: float, window: str = ACCEPTED_SPECTRUM_WINDOWS.blackmanharris, harmonics: int = 5) -> dict:
+    #Fundamental (largest tone out of DC), harmonics 2..harmonics (dBc), THD, SFDR, SNR, SINAD and ENOB of each wave (NaN for harmonics aliased over DC or over the fundamental).
+    waves = np.asarray(waves, dtype='double')
+    n_points = waves.shape[-1]
+    window_values = spectrum_window(n_points, window)
+    power = power_spectrum(waves, window)
+    lobe = len(WINDOW_COEFFICIENTS[window])
+    bins = np.arange(power.shape[-1])
+    dc_lobe = bins <= lobe
+    fundamental = np.argmax(np.where(dc_lobe, 0, power), axis=-1)[..., np.newaxis]
+    cumulative_power = np.concatenate((np.zeros(power.shape[:-1] + (1,)), np.cumsum(power, axis=-1)), axis=-1)
+    cumulative_moment = np.concatenate((np.zeros(power.shape[:-1] + (1,)), np.cumsum(power * bins, axis=-1)), axis=-1)
+    fundamental_power = lobe_power(cumulative_power, fundamental, lobe)
+    harmonic_bins = aliased_bins(fundamental * np.arange(2, harmonics+1), n_points)
+    valid = (harmonic_bins > 2*lobe) & (np.abs(harmonic_bins - fundamental) > 2*lobe)
+    harmonic_power = np.where(valid, lobe_power(cumulative_power, harmonic_bins, lobe), 0)
+    dc_power = cumulative_power[..., lobe+1:lobe+2]
+    distortion = harmonic_power.sum(axis=-1, keepdims=True)
+    noise = np.maximum(cumulative_power[..., -1:] - dc_power - fundamental_power - distortion, MAGNITUDE_FLOOR)
+    spurs = np.where(dc_lobe | (np.abs(bins - fundamental) <= lobe), 0, power).max(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fundamental_bin = lobe_power(cumulative_moment, fundamental, lobe) / fundamental_power #Power centroid of the lobe (frequency between bins).
+        sinad = 10*np.log10(fundamental_power / (noise + distortion))
+        results = {
+            'fundamental_frequency': fundamental_bin / (n_points*xincr),
+            'fundamental_amplitude': 2*np.sqrt(fundamental_power / (n_points * np.square(window_values).sum())),
+            **{f"harmonic_{order}": np.where(valid[..., order-2:order-1], 10*np.log10(harmonic_power[..., order-2:order-1] / fundamental_power), np.nan) for order in range(2, harmonics+1)},
+            'thd': 10*np.log10(distortion / fundamental_power),
+            'sfdr': 10*np.log10(np.take_along_axis(power, fundamental, axis=-1) / spurs), #Peak bins (largest spur out of the DC and fundamental lobes).
+            'snr': 10*np.log10(fundamental_power / noise),
+            'sinad': sinad,
+            'enob': (sinad - 1.76) / 6.02,
+        }
+    return {name: values[..., 0] for (name, values) in results.items()}
+
+def spectrum_units(name: str): #Unit of a result of analyse_spectrum (the harmonics are relative to the fundamental).
+    return SPECTRUM_UNITS.get(name, 'dBc')
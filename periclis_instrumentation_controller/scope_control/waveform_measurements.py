@@ -0,0 +1,104 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file waveform_measurements.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import numpy as np # http://www.numpy.org
+
+## Measurements computed at once for every wave of an array shaped (..., points): (points), (channels, points) or (segments, channels, points).
+## Each measurement has the shape of the array without the points axis. Measurements that can not be computed (no edge...) are NaN.
+
+MEASUREMENT_UNITS = {'mean': 'V', 'rms': 'V', 'minimum': 'V', 'maximum': 'V', 'vpp': 'V', 'base': 'V', 'top': 'V', 'frequency': 'Hz', 'period': 's',
+                     'duty_cycle': '%', 'rise_time': 's', 'fall_time': 's', 'overshoot': '%', 'rising_crossings': '', 'falling_crossings': ''}
+RISE_LOW_LEVEL = 0.1 #Rise/fall times between 10% and 90% of the amplitude (top - base).
+RISE_HIGH_LEVEL = 0.9
+
+def crossing_mask(waves, level, rising: bool = True): #(..., points-1) True where the wave crosses the level between the point and the next one.
+    above = waves >= np.asarray(level)[..., np.newaxis]
+    if rising:
+        return ~above[..., :-1] & above[..., 1:]
+    return above[..., :-1] & ~above[..., 1:]
+
+def interpolated_position(waves, level, index): #Fractional position of the crossings at index (shape (...)) of each wave. NaN where index is -1.
+    valid = index >= 0
+    safe_index = np.where(valid, index, 0)[..., np.newaxis]
+    before = np.take_along_axis(waves, safe_index, axis=-1)[..., 0]
+    after = np.take_along_axis(waves, safe_index + 1, axis=-1)[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        position = safe_index[..., 0] + (np.asarray(level) - before) / (after - before)
+    return np.where(valid, position, np.nan)
+
+def first_index(mask): #Index of the first True along the last axis (-1 if there is none).
+    return np.where(mask.any(axis=-1), mask.argmax(axis=-1), -1)
+
+def last_index(mask): #Index of the last True along the last axis (-1 if there is none).
+    return np.where(mask.any(axis=-1), mask.shape[-1] - 1 - mask[..., ::-1].argmax(axis=-1), -1)
+
+def levels(waves): #Base and top levels: means of the points below and above the middle of the excursion.
+    minimum = waves.min(axis=-1)
+    maximum = waves.max(axis=-1)
+    high = waves >= ((minimum + maximum) / 2)[..., np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        top = np.where(high, waves, 0).sum(axis=-1) / high.sum(axis=-1)
+        base = np.where(high, 0, waves).sum(axis=-1) / (~high).sum(axis=-1)
+    return (minimum, maximum, np.where(np.isnan(base), minimum, base), top)
+
+def edge_time(waves, start_level, stop_level, rising: bool, xincr: float): #Duration of the first complete edge of each wave (last crossing of start_level before the crossing of stop_level).
+    start_mask = crossing_mask(waves, start_level, rising)
+    points = np.arange(start_mask.shape[-1])
+    stop = first_index(crossing_mask(waves, stop_level, rising) & (points >= first_index(start_mask)[..., np.newaxis]) & start_mask.any(axis=-1)[..., np.newaxis])
+    start = last_index(start_mask & (points <= stop[..., np.newaxis]))
+    duration = (interpolated_position(waves, stop_level, stop) - interpolated_position(waves, start_level, start)) * xincr
+    return np.where((stop >= 0) & (start >= 0), duration, np.nan)
+
+def measure_waves(waves, xincr: float, threshold=None) -> dict: #threshold: level (V) of the crossings counts, frequency and duty cycle (default: middle of base and top).
+    waves = np.asarray(waves, dtype='double')
+    (minimum, maximum, base, top) = levels(waves)
+    amplitude = top - base
+    middle = (base + top) / 2 if threshold is None else np.broadcast_to(float(threshold), base.shape)
+    rising = crossing_mask(waves, middle, True)
+    falling = crossing_mask(waves, middle, False)
+    rising_count = rising.sum(axis=-1)
+    first_rising = first_index(rising)
+    last_rising = last_index(rising)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        period = (interpolated_position(waves, middle, last_rising) - interpolated_position(waves, middle, first_rising)) * xincr / (rising_count - 1)
+        period = np.where(rising_count > 1, period, np.nan)
+        points = np.arange(waves.shape[-1])
+        whole_periods = (points >= first_rising[..., np.newaxis]) & (points < last_rising[..., np.newaxis]) #Duty cycle over an integer number of periods.
+        high = waves >= middle[..., np.newaxis]
+        duty_cycle = np.where(rising_count > 1, (high & whole_periods).sum(axis=-1) / whole_periods.sum(axis=-1) * 100, np.nan)
+        overshoot = (maximum - top) / amplitude * 100
+    return {
+        'mean': waves.mean(axis=-1),
+        'rms': np.sqrt(np.mean(np.square(waves), axis=-1)),
+        'minimum': minimum,
+        'maximum': maximum,
+        'vpp': maximum - minimum,
+        'base': base,
+        'top': top,
+        'frequency': 1 / period,
+        'period': period,
+        'duty_cycle': duty_cycle,
+        'rise_time': edge_time(waves, base + RISE_LOW_LEVEL*amplitude, base + RISE_HIGH_LEVEL*amplitude, True, xincr),
+        'fall_time': edge_time(waves, base + RISE_HIGH_LEVEL*amplitude, base + RISE_LOW_LEVEL*amplitude, False, xincr),
+        'overshoot': overshoot,
+        'rising_crossings': rising_count,
+        'falling_crossings': falling.sum(axis=-1),
+    }
+
+def measurements_by_channel(measurements: dict, channels: list) -> dict: #{'CH1': {'mean': value...}} from measurements shaped (..., channels) (values of stacks stay arrays, one per segment).
+    return {f"CH{channel}": {name: (values[..., index] if np.ndim(values[..., index]) else values[..., index].item()) for name, values in measurements.items()}
+            for index, channel in enumerate(channels)}
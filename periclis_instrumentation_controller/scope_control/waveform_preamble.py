@@ -0,0 +1,141 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file waveform_preamble.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+from typing import NamedTuple
+from periclis_instrumentation_controller.scope_control.device_specific_commands import WRITE_COMMANDS, WRITE_ACQUISITION, FASTFRAME_COMMANDS, PREAMBLE_FIELDS
+from periclis_instrumentation_controller.utils.command_templates import match_template
+
+# Preamble of a curve transfer, as answered by WFMOutpre?.
+class WaveformPreamble(NamedTuple):
+    byt_nr: int
+    bit_nr: int
+    encdg: str
+    bn_fmt: str
+    byt_or: str
+    wfid: str
+    nr_pt: int
+    pt_fmt: str
+    xunit: str
+    xincr: float # seconds / point.
+    xzero: float # sub-sample trigger correction.
+    pt_off: int # trigger point.
+    yunit: str
+    ymult: float # volts / level.
+    yoff: float # reference position (level).
+    yzero: float # reference voltage.
+
+def split_preamble_answer(answer: str): #Splits the answer on the ';' that are outside quoted strings (WFId has its own punctuation).
+    fields = []
+    current = ''
+    quoted = False
+    for char in answer.strip():
+        if char == '"':
+            quoted = not quoted
+        if char == ';' and not quoted:
+            fields.append(current.strip())
+            current = ''
+        else:
+            current += char
+    fields.append(current.strip())
+    return fields
+
+def preamble_field_name(header: str): #Converts a long or short mnemonic (':WFMOUTPRE:BYT_NR', 'BYT_N'...) to the WaveformPreamble field name.
+    header = header.split(':')[-1].upper()
+    for field in PREAMBLE_FIELDS:
+        short_form = ''.join(char for char in field if not char.islower())
+        if header.startswith(short_form) and field.upper().startswith(header):
+            return field.lower()
+    return None
+
+def parse_preamble(answer: str) -> WaveformPreamble:
+    fields = split_preamble_answer(answer)
+    values = {}
+    if preamble_field_name(fields[0].partition(' ')[0]) is not None: #Answer with headers ('BYT_NR 1;BIT_NR 8;...').
+        for field in fields:
+            (header, _, value) = field.partition(' ')
+            name = preamble_field_name(header)
+            if name is not None: #Fields unknown to this CLI are ignored.
+                values[name] = value.strip()
+    else: #Answer without headers: fields are identified by their position.
+        values = {name.lower(): value for name, value in zip(PREAMBLE_FIELDS, fields)}
+    try:
+        return WaveformPreamble(**{name: field_type(values[name].strip('"')) if field_type is str else field_type(float(values[name]))
+                                   for name, field_type in WaveformPreamble.__annotations__.items()})
+    except (KeyError, ValueError) as error:
+        raise Exception(f"Invalid waveform preamble received from the scope ({error}): {answer}")
+
+# Writes that change the preamble of a single channel or of every channel.
+CHANNEL_PREAMBLE_COMMANDS = (WRITE_COMMANDS.change_scale_y, WRITE_COMMANDS.change_probe_gain, WRITE_COMMANDS.change_reference_level,
+                             WRITE_COMMANDS.change_channel_on, WRITE_COMMANDS.change_channel_off)
+GLOBAL_PREAMBLE_COMMANDS = (WRITE_COMMANDS.change_scale_x, WRITE_COMMANDS.autoscale, WRITE_COMMANDS.reset, FASTFRAME_COMMANDS.change_state, FASTFRAME_COMMANDS.change_count)
+ACQUISITION_PREAMBLE_COMMANDS = (WRITE_ACQUISITION.change_acquisition_encdg, WRITE_ACQUISITION.change_acquisition_start,
+                                 WRITE_ACQUISITION.change_acquisition_stop, WRITE_ACQUISITION.change_acquisition_byt_n,
+                                 WRITE_ACQUISITION.change_record_length)
+TRIGGER_LEVEL_COMMANDS = (WRITE_COMMANDS.change_trigger_threshold, WRITE_COMMANDS.autoscale, WRITE_COMMANDS.reset)
+
+# Preambles (per channel) and trigger level of the last captures, kept until a write changes them. Only the setup fields are reused: xzero changes with every trigger and is read again for each capture (retimed).
+class preamble_cache():
+    def __init__(self) -> None:
+        self.preambles = {}
+        self.reference_xzero = {} #xzero answered by the scope when the preamble was read (the preamble of a region of interest has another xzero).
+        self.trigger_level = None
+        self.acquisition_settings = {} #Last values written with the WRITE_ACQUISITION templates.
+        self.record_timebase = None #Timebase of the whole record (points outside the region of interest included).
+        self.window_start = None #First point (data:start) of the region of interest, None for the whole record.
+
+    def get(self, channel: int):
+        return self.preambles.get(int(channel))
+
+    def store(self, channel: int, preamble: WaveformPreamble, xzero: float = None):
+        self.preambles[int(channel)] = preamble
+        self.reference_xzero[int(channel)] = preamble.xzero if xzero is None else xzero
+
+    def retimed(self, channel: int, xzero: float): #Cached preamble of the channel with the trigger correction of the last capture (xzero answered now by the scope).
+        preamble = self.preambles[int(channel)]
+        return preamble._replace(xzero=preamble.xzero + float(xzero) - self.reference_xzero[int(channel)])
+
+    def window_preamble(self, preamble: WaveformPreamble): #Preamble of the region of interest with the time of its first point in xzero (pt_off = 0), whatever the convention of the scope model.
+        if self.window_start is None:
+            return preamble
+        return preamble._replace(pt_off=0, xzero=self.record_timebase[self.window_start - 1])
+
+    def invalidate(self, channel: int = None):
+        if channel is None:
+            self.preambles.clear()
+        else:
+            self.preambles.pop(int(channel), None)
+
+    def invalidate_for(self, command: str): #Drops the entries that the command (about to be written) makes obsolete.
+        for template in TRIGGER_LEVEL_COMMANDS:
+            if match_template(command, template) is not None:
+                self.trigger_level = None
+        for template in CHANNEL_PREAMBLE_COMMANDS:
+            arguments = match_template(command, template)
+            if arguments is not None:
+                self.invalidate(arguments['channel'])
+                return
+        for template in GLOBAL_PREAMBLE_COMMANDS:
+            if match_template(command, template) is not None:
+                self.invalidate()
+                self.record_timebase = None
+                return
+        for template in ACQUISITION_PREAMBLE_COMMANDS:
+            arguments = match_template(command, template)
+            if arguments is not None and self.acquisition_settings.get(template) != arguments: #Rewriting the same value keeps the preambles.
+                self.acquisition_settings[template] = arguments
+                self.invalidate()
+                return
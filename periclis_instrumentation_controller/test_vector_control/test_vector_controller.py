@@ -20,7 +20,7 @@ from periclis_instrumentation_controller.test_vector_control.test_vector_resourc
 
 class testvector_controller(TestVectorResourceHandler):
     # Get resource from visa resource manager
-    def __init__(self, resource=None): 
+    def __init__(self, resource=None, resource_manager=None): #No VISA session: the resource manager is not used.
         super().__init__(resource)
         
     def list_services(self) -> dict:
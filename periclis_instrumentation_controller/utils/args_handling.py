@@ -74,9 +74,13 @@ def cmd_parse_input(cmdline : "CMDBase", line):
         return cmdline.default(line)
     else:
         try:
-            func = getattr(cmdline, 'do_' + cmd)
+            command = line.split(' ')[0]
+            func = cmdline.namespace_service(command) if '.' in command else getattr(cmdline, 'do_' + cmd) #namespace.service: service of a connected controller that is not the active one.
         except AttributeError:
             return cmdline.default(line)
+        except Exception as error: #Namespace not connected or service not available.
+            print_red(str(error))
+            return
         if arg!=None:
             try:
                 return func(arg)
@@ -90,6 +94,9 @@ def cmd_parse_input(cmdline : "CMDBase", line):
                 return func()
             except TypeError: #Case that the number of arguments is wrong.
                 print_red("Command could not be excuted! Check the correct number of command arguments!")
+            except Exception as error: #Case that an exception has been raised by a service.
+                print_red("Command could not be excuted!")
+                print_red(str(error))
             
 
 # Check if ID label is a valid pyvisa name to be used
@@ -0,0 +1,92 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file command_batching.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+from contextlib import contextmanager
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_worker, instrument_job
+
+ERROR_QUEUE_DEPTH = 32 #Maximum errors read from the instrument after a batch.
+
+## Writes joined in a single SCPI program message ('cmd1;:cmd2;*cmd3'), so that configuration sequences pay a single VISA transaction
+
+def join_commands(commands: list): #Each command is sent from the root of the command tree (';:'), so that short headers are not taken as relative to the previous command.
+    return ';'.join(command if index == 0 or command.startswith((':', '*')) else ':' + command for index, command in enumerate(commands))
+
+def error_code(answer: str): #Code of an error queue answer ('-113,"Undefined header"' or ':EVMSG 0,"No events to report"'), None if it has no code.
+    try:
+        return int(float(answer.partition(',')[0].split()[-1]))
+    except (ValueError, IndexError):
+        return None
+
+class CommandBatch():
+    def __init__(self, instrument, buffer_size: int, error_query: str, no_error_codes: tuple = (0,), error_prepare: str = None, error_codes = None) -> None:
+        self.instrument = instrument
+        self.buffer_size = int(buffer_size) #Input buffer of the instrument (characters of a program message).
+        self.error_query = error_query #Returns the oldest error of the queue.
+        self.no_error_codes = no_error_codes #Codes answered when the error queue is empty.
+        self.error_prepare = error_prepare #Query that moves the events to the error queue (None if not needed).
+        self.error_codes = error_codes #Codes reported as errors (None: every code but the no_error_codes). The other events are read and skipped.
+        self.pending = []
+        self.depth = 0 #Nested batches: the outermost one sends the commands.
+        self.queued = 0 #Commands queued by the open batch.
+        self.instrument_worker = instrument_worker(instrument) #The pending commands are only changed by jobs of the instrument worker.
+
+    @instrument_job
+    def write(self, command: str): #Sends the command, or queues it while a batch is open.
+        if not self.depth:
+            self.instrument.write(command)
+            return
+        if self.pending and len(join_commands(self.pending + [command])) > self.buffer_size:
+            self.flush()
+        self.pending.append(command)
+        self.queued += 1
+
+    @instrument_job
+    def flush(self): #Sends the queued commands (before any query, so that the answer reflects them).
+        if self.pending:
+            message = join_commands(self.pending)
+            self.pending = []
+            self.instrument.write(message)
+
+    @contextmanager
+    def batch(self, check_errors: bool = True):
+        if not self.depth:
+            self.queued = 0
+        self.depth += 1
+        completed = False
+        try:
+            yield self
+            completed = True
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.flush()
+                if completed and check_errors and self.queued: #Nothing to check if every write was skipped.
+                    self.check_errors()
+
+    @instrument_job
+    def check_errors(self): #Reads the error queue once, after the whole batch.
+        if self.error_prepare is not None:
+            self.instrument.query(self.error_prepare)
+        errors = []
+        for _ in range(ERROR_QUEUE_DEPTH):
+            answer = self.instrument.query(self.error_query).strip()
+            if error_code(answer) in self.no_error_codes or error_code(answer) is None:
+                break
+            if self.error_codes is None or abs(error_code(answer)) in self.error_codes:
+                errors.append(answer)
+        if errors:
+            raise Exception(f"Instrument reported errors after the commands: {'; '.join(errors)}")
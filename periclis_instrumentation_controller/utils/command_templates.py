@@ -0,0 +1,38 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file command_templates.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import re
+from functools import lru_cache
+
+## Utility functions to recognize which device_specific_commands template generated a command
+
+@lru_cache(maxsize=None)
+def template_pattern(template: str): #Converts a template such as 'CH{channel}:SCAle {scale_y}' into a case insensitive regex.
+    parts = re.split(r'\{(\w+)\}', template)
+    regex = ''
+    for index, part in enumerate(parts):
+        if index % 2: #Odd parts are the names of the template arguments.
+            regex += rf'(?P<{part}>\d+)' if part == 'channel' else rf'(?P<{part}>.+?)'
+        else:
+            regex += re.escape(part)
+    return re.compile(regex + r'\s*$', re.IGNORECASE)
+
+def match_template(command: str, template: str): #Returns the template arguments used on the command, or None if it was not generated by the template.
+    match = template_pattern(template).match(command.strip())
+    if match is None:
+        return None
+    return match.groupdict()
@@ -23,6 +23,7 @@ class WaveformController_Configurations:
     rounding_places_pulse_width = 'error_non_positive'
     rounding_places_pulse_edges = 'error_non_positive' 
     standard_timeout = 'error_non_positive'
+    command_buffer_size = 'error_non_positive'
  
 class ScopeController_Configurations:
     standard_channel = 'error_non_positive'
@@ -35,7 +36,6 @@ class ScopeController_Configurations:
     rounding_places_time_scale = 'error_non_positive'
     rounding_places_time_acquisition = 'error_non_positive'
     rounding_places_voltage_acquisition = 'error_non_positive'
-    delay_check_wave = 'error_non_positive'
     delay_scale = 'error_non_positive'
     delay_autoscale = 'error_non_positive'
     delay_acquisition = 'error_non_positive'
@@ -57,6 +57,35 @@ class ScopeController_Configurations:
     add_channel_trigger_plot_1 = 'error_non_positive'
     add_channel_trigger_plot_2 = 'error_non_positive'
     add_channel_trigger_plot_3 = 'error_non_positive'
+    multi_channel_acquisition = 'error_interval', 0, 1
+    wait_method = 'check_list_options', 'ACCEPTED_WAIT_METHODS'
+    wait_poll_initial = 'error_non_positive'
+    wait_poll_max = 'error_non_positive'
+    acquisition_bytes_per_point = 'error_interval', 1, 2
+    acquisition_byte_order = 'check_list_options', 'ACCEPTED_BYTE_ORDERS'
+    acquisition_float_type = 'check_list_options', 'ACCEPTED_FLOAT_TYPES'
+    storage_format = 'check_list_options', 'ACCEPTED_STORAGE_FORMATS'
+    stream_ring_slots = 'error_non_positive'
+    stream_batch_captures = 'error_non_positive'
+    stream_frame_timeout = 'error_non_positive'
+    trigger_wait_method = 'check_list_options', 'ACCEPTED_TRIGGER_WAIT_METHODS'
+    trigger_wait_timeout = 'error_negative'
+    segmented_acquisition = 'error_interval', 0, 1
+    spectrum_window = 'check_list_options', 'ACCEPTED_SPECTRUM_WINDOWS'
+    spectrum_harmonics = 'error_interval', 2, 50
+    eye_time_bins = 'error_interval', 2, 100000 #At least one bin per bit period of the eye (EYE_UNIT_INTERVALS).
+    eye_voltage_bins = 'error_non_positive'
+    jitter_histogram_bins = 'error_non_positive'
+    mask_voltage_tolerance = 'error_negative'
+    mask_time_tolerance = 'error_negative'
+    mask_inline_test = 'error_interval', 0, 1
+    averaging_mode = 'check_list_options', 'ACCEPTED_AVERAGING_MODES'
+    averaging_count = 'error_non_positive'
+    roi_mode = 'check_list_options', 'ACCEPTED_ROI_MODES'
+    roi_start = 'error_non_numerical'
+    roi_stop = 'error_non_numerical'
+    command_buffer_size = 'error_non_positive'
+    state_cache_ttl = 'error_negative'
 
 class TestVectorController_Configurations:
     vpp_voltage = 'error_negative'
@@ -0,0 +1,86 @@
+# DAT/EMI - Electronics and Microelectronics Department
+# Redistribution, modification or use of this software in source or binary
+# forms is permitted as long as the files maintain this copyright.
+
+###############################################################################
+# DAT/EMI and the Brazilian Center for Research in Energy and Materials (CNPEM)
+# are not liable for any misuse of this material.
+#
+# @file instrument_worker.py
+#
+# @brief CLI for controlling OScilloscope, Wavegenerator and TestVector.
+#
+# @author Pedro Trindade
+# @author Eric Sonagli Abbade.
+# @date 24/04/2024
+###############################################################################
+
+import threading
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+
+## One worker thread per instrument: its SCPI traffic is serialized in a queue (commands keep their order), while different instruments run concurrently
+
+class InstrumentWorker():
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.thread = None #Set when the worker thread starts.
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"instrument {name}", initializer=self._started)
+
+    def _started(self):
+        self.thread = threading.current_thread()
+
+    def submit(self, function, *args, **kwargs) -> Future: #Queues the call: the future gets its result (or exception) once the previous calls of the instrument are done.
+        if threading.current_thread() is self.thread: #Called by a job of the worker: running now keeps the order (and queuing would wait for the job itself).
+            future = Future()
+            try:
+                future.set_result(function(*args, **kwargs))
+            except BaseException as error:
+                future.set_exception(error)
+            return future
+        return self.executor.submit(function, *args, **kwargs)
+
+    def run(self, function, *args, **kwargs): #Blocking call: waits for the queued calls and returns the result.
+        return self.submit(function, *args, **kwargs).result()
+
+    def stop(self): #Runs the calls already queued and ends the thread.
+        self.executor.shutdown(wait=threading.current_thread() is not self.thread)
+
+# VISA session whose calls (write, query, read_raw, clear...) and attribute changes (timeout, chunk_size...) run on the worker of the instrument.
+class WorkerSession():
+    def __init__(self, session, worker: InstrumentWorker = None) -> None:
+        object.__setattr__(self, 'session', session)
+        object.__setattr__(self, 'worker', worker or InstrumentWorker(getattr(session, 'resource_name', str(session))))
+
+    def __getattr__(self, name):
+        attribute = getattr(self.session, name)
+        if not callable(attribute):
+            return attribute
+        def call(*args, **kwargs):
+            return self.worker.run(attribute, *args, **kwargs)
+        return call
+
+    def __setattr__(self, name, value):
+        self.worker.run(setattr, self.session, name, value)
+
+    def close(self):
+        try:
+            self.worker.run(self.session.close)
+        finally:
+            self.worker.stop()
+
+def instrument_job(method): #Method run as a single job of self.instrument_worker: its VISA calls and cache changes are never interleaved with other jobs of the instrument.
+    @functools.wraps(method)
+    def job(self, *args, **kwargs):
+        return self.instrument_worker.run(method, self, *args, **kwargs)
+    return job
+
+INSTRUMENT_WORKERS = {} #Worker of each resource name whose session does not have one (sessions opened outside the resource manager pool).
+
+def instrument_worker(instrument) -> InstrumentWorker:
+    if isinstance(instrument, WorkerSession):
+        return instrument.worker
+    name = getattr(instrument, 'resource_name', str(instrument))
+    if name not in INSTRUMENT_WORKERS:
+        INSTRUMENT_WORKERS[name] = InstrumentWorker(name)
+    return INSTRUMENT_WORKERS[name]
@@ -14,7 +14,7 @@
 # @author Eric Sonagli Abbade.
 # @date 24/04/2024
 ###############################################################################
-from periclis_instrumentation_controller.scope_control.device_specific_commands import ACCEPTED_TRIGGER_TYPES, ACCEPTED_CHANNELS, ACCEPTED_TRIGGER_COUPLING, ACCEPTED_TRIGGER_SLOPE
+from periclis_instrumentation_controller.scope_control.device_specific_commands import ACCEPTED_TRIGGER_TYPES, ACCEPTED_CHANNELS, ACCEPTED_TRIGGER_COUPLING, ACCEPTED_TRIGGER_SLOPE, ACCEPTED_WAIT_METHODS, ACCEPTED_BYTE_ORDERS, ACCEPTED_FLOAT_TYPES, ACCEPTED_STORAGE_FORMATS, ACCEPTED_TRIGGER_WAIT_METHODS, ACCEPTED_SPECTRUM_WINDOWS, ACCEPTED_AVERAGING_MODES, ACCEPTED_ROI_MODES
 from periclis_instrumentation_controller.test_vector_control.specific_commands import ACCEPTED_WAVE_TYPE
 from periclis_instrumentation_controller.utils.arguments_error_functions import errors_arguments_mapping
 import periclis_instrumentation_controller.utils.errors_handling as errors_handling
@@ -34,6 +34,14 @@ options_mapping = {
     'ACCEPTED_CHANNELS': ACCEPTED_CHANNELS,
     'ACCEPTED_TRIGGER_COUPLING': ACCEPTED_TRIGGER_COUPLING,
     'ACCEPTED_TRIGGER_SLOPE': ACCEPTED_TRIGGER_SLOPE,
+    'ACCEPTED_WAIT_METHODS': ACCEPTED_WAIT_METHODS,
+    'ACCEPTED_BYTE_ORDERS': ACCEPTED_BYTE_ORDERS,
+    'ACCEPTED_FLOAT_TYPES': ACCEPTED_FLOAT_TYPES,
+    'ACCEPTED_STORAGE_FORMATS': ACCEPTED_STORAGE_FORMATS,
+    'ACCEPTED_TRIGGER_WAIT_METHODS': ACCEPTED_TRIGGER_WAIT_METHODS,
+    'ACCEPTED_SPECTRUM_WINDOWS': ACCEPTED_SPECTRUM_WINDOWS,
+    'ACCEPTED_AVERAGING_MODES': ACCEPTED_AVERAGING_MODES,
+    'ACCEPTED_ROI_MODES': ACCEPTED_ROI_MODES,
     'ACCEPTED_WAVE_TYPE': ACCEPTED_WAVE_TYPE
 }
 
@@ -72,4 +72,9 @@ class QUERY_COMMANDS:
     read_idn = '*IDN?'
     read_opt = '*OPT?'
     read_opc = '*OPC?'
-   
\ No newline at end of file
+   
+
+
+class ERROR_COMMANDS: #Error queue, read once after each batch of writes.
+    read_error = ':SYSTem:ERRor?' #Returns the oldest error: <code>,"<message>".
+    no_error_codes = (0,) #0: queue empty.
@@ -22,6 +22,9 @@ SERVICES_METAINFO = {
    "change_instrument_timeout": {
        "args": {"Timeout to be waited until communication finishes (s).": None}
        },
+   "change_waveform": {
+       "args": {"function type, frequency (Hz), amplitude (V), offset (V), channel": None}
+       },
    "change_amplitude": {
        "args": {"voltage (V)": None}
        },
@@ -22,19 +22,21 @@ from periclis_instrumentation_controller.utils.color_handling import *
 from periclis_instrumentation_controller.utils.file_parsing import *
 from periclis_instrumentation_controller.waveform_control.controller_config import *
 
-import pyvisa as visa
+from periclis_instrumentation_controller.resource_manager.resource_manager import PeriCLIsResourceManager
 
 import logging 
 class waveform_controller(WaveformInfoReader, WaveformWriter):
     # Get resource from visa resource manager
-    def __init__(self, resource=None): 
-        self.rm = visa.ResourceManager()
+    def __init__(self, resource=None, resource_manager=None): 
+        self.own_resource_manager = resource_manager is None #Standalone use: the controller opens (and closes) its own resource manager.
+        self.rm = PeriCLIsResourceManager() if self.own_resource_manager else resource_manager
+        self.resource = resource
         # For the cases that the resources are VISA IDs.
         if resource != None and not check_if_visa_name(resource):
             logging.exception("Not Valid Visa ID")
             raise Exception("Not Valid Visa ID")
         
-        self.waveform_generator = self.rm.open_resource(resource) 
+        self.waveform_generator = self.rm.open_session(resource) #Session of the pool, still open if the resource was used before.
         convert_list_variables(self, (RESOURCE_DIR), (FILE_NAME + INPUT_FORMAT), '.csv') #Convert variables from the configuration.csv file to Python variables. 
         self.waveform_generator.timeout = (float(self.standard_timeout))*1000 #Sets the initial timeout.
         WaveformInfoReader.__init__(self, self.waveform_generator)
@@ -45,8 +47,10 @@ class waveform_controller(WaveformInfoReader, WaveformWriter):
         return get_services(controler_name='WaveformController')
     
     def disconnect(self):
-        self.waveform_generator.close()
-        self.rm.close()
+        self.command_batch.flush()
+        self.rm.release_session(self.resource) #Kept warm for the next connection to the generator.
+        if self.own_resource_manager:
+            self.rm.close()
         
 
    
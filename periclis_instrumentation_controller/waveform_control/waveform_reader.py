@@ -16,6 +16,8 @@
 ###############################################################################
 
 from periclis_instrumentation_controller.waveform_control.device_specific_commands import QUERY_COMMANDS
+from concurrent.futures import Future
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_job
 from periclis_instrumentation_controller.waveform_control.controller_config import *
 from periclis_instrumentation_controller.utils.decorators import service_add
 from periclis_instrumentation_controller.utils.color_handling import *
@@ -33,7 +35,8 @@ class WaveformInfoReader:
         self.waveform_generator = waveform_generator
         
     
-    def _query(self, query_string : str):
+    @instrument_job
+    def _query(self, query_string : str): #Runs on the generator worker (blocking).
         """
         This function takes a query string as input and calls the query method of the waveform_generator
         object with that query string.
@@ -45,8 +48,12 @@ class WaveformInfoReader:
         @return The `query` method is returning the result of calling the `query` method of the
         `waveform_generator` object with the `query_string` parameter.
         """
+        self.command_batch.flush() #Queued writes are sent before the query.
         return self.waveform_generator.query(query_string)
 
+    def query_future(self, query_string : str) -> Future: #_query queued on the generator worker, after the calls already queued: the future gets the answer.
+        return self.instrument_worker.submit(self._query, query_string)
+
     @service
     def read_default_configurations(self):
         print_configurations(RESOURCE_DIR, DEFAULT_CONFIGURATIONS, INPUT_FORMAT)   
@@ -61,10 +68,10 @@ class WaveformInfoReader:
         The `query_info` function retrieves configuration information by querying specific commands.
         
         @return The `query_info` method is returning a concatenated string of the results of querying three
-        commands: '*IDN?', '*OPT?', and '*OPC?'.
+        commands: '*IDN?', '*OPT?', and '*OPC?'. The identification and options are asked once per session (pool of the resource manager).
         """
-        some_config_info = self._query('*IDN?') + self._query('*OPT?') \
-                   + self._query('*OPC?')
+        some_config_info = self.rm.probe(self.resource, QUERY_COMMANDS.read_idn) + self.rm.probe(self.resource, QUERY_COMMANDS.read_opt) \
+                   + self._query(QUERY_COMMANDS.read_opc)
 
         print_green(some_config_info)
         #return some_config_info
@@ -15,10 +15,13 @@
 # @date 24/04/2024
 ###############################################################################
 
-from periclis_instrumentation_controller.waveform_control.device_specific_commands import WRITE_COMMANDS, ACCEPTED_FUNCTION_TYPES, ACCEPTED_PRBS_DATA_TYPES
+from periclis_instrumentation_controller.waveform_control.device_specific_commands import WRITE_COMMANDS, ERROR_COMMANDS, ACCEPTED_FUNCTION_TYPES, ACCEPTED_PRBS_DATA_TYPES
 from periclis_instrumentation_controller.waveform_control.services_metainfo import SERVICES_METAINFO
 from periclis_instrumentation_controller.waveform_control.controller_config import *
 from periclis_instrumentation_controller.utils.decorators import service_add
+from periclis_instrumentation_controller.utils.command_batching import CommandBatch
+from periclis_instrumentation_controller.utils.instrument_worker import instrument_worker, instrument_job
+from concurrent.futures import Future
 from periclis_instrumentation_controller.utils.errors_handling import *
 from periclis_instrumentation_controller.utils.file_parsing import *
 from periclis_instrumentation_controller.cli.execute_visa_commands import visa_read, visa_write
@@ -30,10 +33,20 @@ service = service_add(controller_name=CONTROLLER_NAME,
 class WaveformWriter:
     def __init__(self, waveform_generator) -> None:
         self.waveform_generator = waveform_generator
+        self.command_batch = CommandBatch(self.waveform_generator, self.command_buffer_size, ERROR_COMMANDS.read_error, ERROR_COMMANDS.no_error_codes)
+        self.instrument_worker = instrument_worker(self.waveform_generator) #Thread that runs the SCPI traffic of the generator, in order.
         
                 
-    def _write(self, waveform_command : str):
-        self.waveform_generator.write(waveform_command)
+    @instrument_job
+    def _write(self, waveform_command : str): #Runs on the generator worker (blocking).
+        self.command_batch.write(waveform_command)
+
+    def write_future(self, waveform_command : str) -> Future: #_write queued on the generator worker: returns at once (e.g. while the scope transfers a curve).
+        return self.instrument_worker.submit(self._write, waveform_command)
+
+    def batched_writes(self, check_errors: bool = True): #with self.batched_writes(): the writes are sent together (up to command_buffer_size characters per message) when the block ends.
+        self.command_batch.buffer_size = int(self.command_buffer_size)
+        return self.command_batch.batch(check_errors)
     
     @service
     def default_configurations (self): 
@@ -57,6 +70,22 @@ class WaveformWriter:
         error_non_positive(timeout_value, "change_instrument_timeout", "timeout", int(self.rounding_places)) #Checks if the argument is non positive.
         self.waveform_generator.timeout = (timeout_value*1000) #Changes the timeout to the desired value (s).
 
+    @service
+    def change_waveform(self, args): #Function type, frequency, amplitude and offset of the channel written with a single message.
+        if not isinstance(args, list) or len(args) < 4:
+            raise Exception("Must inform (function type) + (frequency) + (amplitude) + (offset) after command!")
+        (function_type, freq_hz, amplitude, offset_value) = args[:4]
+        channel = int(args[4]) if len(args) > 4 else 1
+        check_list_options(function_type, dir(ACCEPTED_FUNCTION_TYPES), "change_waveform", "function type")
+        error_non_positive(freq_hz, "change_waveform", "frequency", self.rounding_places) #Checks if the argument is non positive.
+        error_non_positive(amplitude, "change_waveform", "voltage", self.rounding_places) #Checks if the argument is non positive.
+        error_non_numerical(offset_value, "change_waveform", "offset", self.rounding_places) #Checks if the argument is numeric.
+        with self.batched_writes():
+            self._write(WRITE_COMMANDS.change_function_type.format(channel=channel, function_type=getattr(ACCEPTED_FUNCTION_TYPES, function_type)))
+            self._write(WRITE_COMMANDS.change_frequency.format(channel=channel, frequency=freq_hz)) #Frequency (in Hz).
+            self._write(WRITE_COMMANDS.change_amplitude.format(channel=channel, voltage=amplitude)) #Amplitude (in V).
+            self._write(WRITE_COMMANDS.change_offset.format(channel=channel, offset_voltage=offset_value)) #Offset (in V).
+
     @service
     def change_amplitude(self, amplitude : float, channel : int = 1):
         amplitude = first_list_argument(amplitude, self.rounding_places)
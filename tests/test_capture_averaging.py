@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from periclis_instrumentation_controller.scope_control.capture_averaging import CaptureAccumulator
+from periclis_instrumentation_controller.scope_control.device_specific_commands import ACCEPTED_AVERAGING_MODES
+
+def noisy_captures(count: int): #(captures, channels, points): a sine and a DC level with gaussian noise.
+    rng = np.random.default_rng(0)
+    clean = np.stack((np.sin(np.linspace(0, 4*np.pi, 500)), np.full(500, 0.3)))
+    return clean + rng.normal(0, 0.1, (count, 2, 500))
+
+def accumulate(mode: str, captures, weight: int = 8):
+    accumulator = CaptureAccumulator(captures.shape[1], captures.shape[2], mode, weight)
+    for waves in captures:
+        accumulator.add(waves)
+    return accumulator
+
+def test_mean():
+    captures = noisy_captures(50)
+    accumulator = accumulate(ACCEPTED_AVERAGING_MODES.mean, captures)
+    assert accumulator.count == 50
+    assert accumulator.mean == pytest.approx(captures.mean(axis=0), abs=1e-12)
+    assert accumulator.envelope() is None and accumulator.minimum is None #No envelope buffers out of the envelope mode.
+
+def test_exponential():
+    captures = noisy_captures(40)
+    accumulator = accumulate(ACCEPTED_AVERAGING_MODES.exponential, captures, weight=8)
+    expected = captures[:8].mean(axis=0) #Plain mean until the weight is reached.
+    for waves in captures[8:]:
+        expected += (waves - expected) / 8
+    assert accumulator.mean == pytest.approx(expected, abs=1e-12)
+    assert accumulator.envelope() is None
+
+def test_envelope():
+    captures = noisy_captures(30)
+    accumulator = accumulate(ACCEPTED_AVERAGING_MODES.envelope, captures)
+    (minimum, maximum) = accumulator.envelope()
+    assert (minimum == captures.min(axis=0)).all() and (maximum == captures.max(axis=0)).all()
+    assert accumulator.mean == pytest.approx(captures.mean(axis=0), abs=1e-12)
+
+def test_noise_is_reduced():
+    captures = noisy_captures(100)
+    clean = np.stack((np.sin(np.linspace(0, 4*np.pi, 500)), np.full(500, 0.3)))
+    residual = accumulate(ACCEPTED_AVERAGING_MODES.mean, captures).mean - clean
+    assert residual.std() == pytest.approx(0.1/np.sqrt(100), rel=0.1)
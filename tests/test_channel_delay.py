@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from periclis_instrumentation_controller.scope_control.channel_delay import correlation_delay
+
+XINCR = 1e-9 #1 GS/s.
+TIME = np.arange(10000) * XINCR
+
+def square_clock(frequency: float, delay: float):
+    return np.where(np.sin(2*np.pi*frequency*(TIME - delay)) >= 0, 1.0, -1.0)
+
+@pytest.mark.parametrize('frequency', [10e6, 20e6, 25e6])
+def test_clock_delay_is_not_off_by_whole_periods(frequency):
+    assert correlation_delay(square_clock(frequency, 0), square_clock(frequency, 3e-9), XINCR) == pytest.approx(3e-9, abs=0.1e-9)
+
+@pytest.mark.parametrize(('frequency', 'delay'), [(20e6, 3.3e-9), (1e6, 3e-9)])
+def test_sine_delay(frequency, delay):
+    assert correlation_delay(np.sin(2*np.pi*frequency*TIME), np.sin(2*np.pi*frequency*(TIME - delay)), XINCR) == pytest.approx(delay, abs=0.1e-9)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from periclis_instrumentation_controller.scope_control.edge_timing import edge_times, jitter_analysis, channel_histograms
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+
+TIMEBASE = Timebase(-10e-6, 1e-9, 20000) #1 GS/s, trigger in the middle.
+PERIOD = 100e-9 #10 MHz clock.
+EDGE = 4e-9 #Linear edges: the interpolated crossings of their middle are exact.
+
+def jittered_clock(jitter: float, seed: int = 0): #Clock whose rising edges (crossing 0.5 V) are at k*PERIOD + 20 ns plus a gaussian error of jitter seconds rms.
+    edges = np.arange(-101, 102) * PERIOD + 20e-9 + np.random.default_rng(seed).normal(0, jitter, 203)
+    knots = np.stack((edges - EDGE/2, edges + EDGE/2, edges + PERIOD/2 - EDGE/2, edges + PERIOD/2 + EDGE/2), axis=-1).ravel()
+    wave = np.interp(TIMEBASE.values(), knots, np.tile([0.0, 1.0, 1.0, 0.0], edges.size))
+    inside = (edges > TIMEBASE[0] + EDGE) & (edges < TIMEBASE[-1] - EDGE)
+    return (wave, edges[inside])
+
+def test_edge_times_are_interpolated_between_points():
+    (wave, expected) = jittered_clock(0.3e-9)
+    (wave_index, times) = edge_times(wave, TIMEBASE, 0.5)
+    assert (wave_index == 0).all()
+    assert times == pytest.approx(expected, abs=1e-15)
+
+def test_jitter_of_known_edge_perturbation():
+    (wave, edges) = jittered_clock(50e-12)
+    (statistics, values) = jitter_analysis(wave, TIMEBASE, 0.5)
+    number = np.arange(edges.size)
+    tie = edges - np.polyval(np.polyfit(number, edges, 1), number)
+    assert statistics['edges'] == edges.size
+    assert statistics['period_mean'] == pytest.approx(PERIOD, rel=1e-4)
+    assert statistics['tie_rms'] == pytest.approx(tie.std(), rel=1e-3)
+    assert statistics['tie_rms'] == pytest.approx(50e-12, rel=0.2)
+    assert statistics['period_jitter_rms'] == pytest.approx(np.diff(edges).std(), rel=1e-3)
+    assert statistics['cycle_to_cycle_rms'] == pytest.approx(np.diff(edges, 2).std(), rel=1e-3)
+    assert values['tie'][0] == pytest.approx(tie, abs=1e-15)
+
+def test_falling_edges_and_stacks():
+    waves = np.stack([np.stack((jittered_clock(0, seed)[0], 1 - jittered_clock(20e-12, seed)[0])) for seed in range(3)]) #(segments, channels, points), channel 2 inverted.
+    (statistics, values) = jitter_analysis(waves, TIMEBASE, 0.5, rising=False)
+    assert statistics['tie_rms'].shape == (3, 2)
+    assert statistics['tie_rms'][:, 0] == pytest.approx([0, 0, 0], abs=1e-15) #Falling edges of the clock without jitter.
+    assert (statistics['tie_rms'][:, 1] > 10e-12).all() #Falling edges of the inverted jittered clock.
+    (counts, bins) = channel_histograms(*values['tie'], 6, 2, 20)
+    assert counts.shape == (2, 20) and bins.shape == (2, 21)
+    assert counts.sum(axis=-1) == pytest.approx(statistics['edges'].sum(axis=0))
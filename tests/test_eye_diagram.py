@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from periclis_instrumentation_controller.scope_control.eye_diagram import EyeDiagram
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+
+BIT_PERIOD = 1e-8 #100 Mbps.
+NOISE = 0.005 #V rms.
+
+def prbs7(bits: int): #x^7 + x^6 + 1.
+    register = 0x7f
+    sequence = []
+    for _ in range(bits):
+        bit = ((register >> 6) ^ (register >> 5)) & 1
+        register = ((register << 1) | bit) & 0x7f
+        sequence.append(bit)
+    return np.array(sequence, dtype='double')
+
+def nrz_capture(samples_per_bit: int, edge_samples: int, bits: int = 400, offset: float = 0.3, jitter: float = 0): #0/1 V NRZ with linear edges of edge_samples points, the bit boundaries at offset bit periods after the trigger (+/- jitter bit periods rms).
+    rng = np.random.default_rng(0)
+    timebase = Timebase(-bits/2*BIT_PERIOD, BIT_PERIOD/samples_per_bit, bits*samples_per_bit)
+    levels = prbs7(bits + 2)
+    half_edge = edge_samples*timebase.xincr/2
+    boundaries = (np.arange(bits + 3) - 1 + offset + rng.normal(0, jitter, bits + 3))*BIT_PERIOD + timebase.t_start
+    knots = np.stack((boundaries[:-1] + half_edge, boundaries[1:] - half_edge), axis=-1).ravel()
+    wave = np.interp(timebase.values(), knots, np.repeat(levels, 2))
+    wave += rng.normal(0, NOISE, wave.size)
+    return (wave[np.newaxis], timebase)
+
+@pytest.mark.parametrize(('samples_per_bit', 'edge_samples'), [(10, 3), (10, 5), (25, 5), (25, 15)])
+def test_eye_of_prbs(samples_per_bit, edge_samples):
+    (waves, timebase) = nrz_capture(samples_per_bit, edge_samples)
+    eye = EyeDiagram.from_waves(waves, [1], BIT_PERIOD, 200, 256)
+    eye.accumulate(waves, timebase)
+    measurements = eye.measurements()
+    assert measurements['eye_amplitude'][0] == pytest.approx(1, abs=0.02)
+    assert measurements['eye_height'][0] == pytest.approx(1 - 6*NOISE, abs=0.03)
+    assert measurements['eye_width'][0] == pytest.approx(BIT_PERIOD, rel=0.05)
+    assert measurements['crossing_time'][0] == pytest.approx(0.3*BIT_PERIOD, abs=0.02*BIT_PERIOD)
+
+def test_eye_width_with_crossing_jitter():
+    (waves, timebase) = nrz_capture(50, 5, bits=2000, jitter=0.02)
+    eye = EyeDiagram.from_waves(waves, [1], BIT_PERIOD, 200, 256)
+    eye.accumulate(waves, timebase)
+    measurements = eye.measurements()
+    assert measurements['crossing_jitter'][0] == pytest.approx(0.02*BIT_PERIOD, rel=0.15)
+    assert measurements['eye_width'][0] == pytest.approx((1 - 6*0.02)*BIT_PERIOD, rel=0.03)
+
+def test_eye_without_crossings_is_not_measured():
+    timebase = Timebase(0, 1e-9, 1000)
+    eye = EyeDiagram([1], BIT_PERIOD, 200, 256, 0, 2) #Threshold at 1 V.
+    eye.accumulate(np.full((1, 1000), 0.5), timebase)
+    measurements = eye.measurements()
+    assert np.isnan(measurements['eye_height'][0]) and np.isnan(measurements['eye_width'][0])
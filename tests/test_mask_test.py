@@ -0,0 +1,53 @@
+from collections import namedtuple
+import numpy as np
+import pytest
+
+from periclis_instrumentation_controller.scope_control.mask_test import WaveformMask, load_mask
+from periclis_instrumentation_controller.scope_control.scope_capture import Timebase
+
+TIMEBASE = Timebase(-500e-9, 1e-9, 1000)
+Preamble = namedtuple('Preamble', ('ymult', 'yoff', 'yzero'))
+
+def reference(): #(channels, points): 5 MHz sine and its inverse.
+    sine = np.sin(2*np.pi*5e6*TIMEBASE.values())
+    return np.stack((sine, -0.5*sine))
+
+def mask():
+    return WaveformMask.from_waves(reference(), [1, 2], TIMEBASE, 0.05, 2e-9)
+
+def test_reference_passes_its_own_mask():
+    results = mask().test(reference())
+    assert results['passed'] and (results['violations'] == 0).all() and (results['first_violation'] == -1).all()
+
+def test_pass_fail_counts_of_captures():
+    captures = np.repeat(reference()[np.newaxis], 10, axis=0) #(captures, channels, points).
+    captures[3, 0, 400] += 0.2 #One point out of the mask.
+    captures[7, 1, 100:105] -= 0.2 #Five points out of the mask.
+    results = mask().test(captures)
+    assert results['passed'].sum() == 8
+    assert not results['passed'][3] and not results['passed'][7]
+    assert results['violations'][3].tolist() == [1, 0] and results['violations'][7].tolist() == [0, 5]
+    assert results['first_violation'][3].tolist() == [400, -1] and results['first_violation'][7].tolist() == [-1, 100]
+
+def test_time_tolerance():
+    shifted = lambda delay: np.stack((np.sin(2*np.pi*5e6*(TIMEBASE.values() - delay)), -0.5*np.sin(2*np.pi*5e6*(TIMEBASE.values() - delay))))
+    assert mask().test(shifted(1e-9))['passed'] #Within the +/- 2 ns of the mask (the record edges only repeat their points).
+    assert not mask().test(shifted(10e-9))['passed']
+
+def test_codes_give_the_same_results_as_volts():
+    preambles = [Preamble(0.01, 0.0, 0.0), Preamble(-0.005, 10.0, 0.1)] #Negative ymult swaps the limits.
+    captures = np.repeat(reference()[np.newaxis], 4, axis=0)
+    captures[1, 0, 50] = 0.9
+    captures[2, 1, 600] = -1
+    codes = np.stack([np.round((captures[:, index] - preamble.yzero) / preamble.ymult + preamble.yoff) for (index, preamble) in enumerate(preambles)], axis=1)
+    volts = np.stack([(codes[:, index] - preamble.yoff) * preamble.ymult + preamble.yzero for (index, preamble) in enumerate(preambles)], axis=1)
+    waveform_mask = mask()
+    (from_codes, from_volts) = (waveform_mask.test_codes(codes.astype(np.int16), preambles), waveform_mask.test(volts))
+    for name in ('passed', 'violations', 'first_violation'):
+        assert (from_codes[name] == from_volts[name]).all()
+
+def test_saved_mask(tmp_path):
+    mask().save(tmp_path/'mask.npz')
+    loaded = load_mask(tmp_path/'mask.npz')
+    assert loaded.channels == [1, 2] and loaded.timebase.n == TIMEBASE.n
+    assert (loaded.lower == mask().lower).all() and (loaded.upper == mask().upper).all()
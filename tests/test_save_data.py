@@ -0,0 +1,29 @@
+import csv
+import numpy as np
+import pytest
+
+import periclis_instrumentation_controller.scope_control.scope_reader #Imports the scope modules in their usual order.
+from periclis_instrumentation_controller.scope_control.save_data import write_array_csv
+
+HEADER = ['time', 'voltage_ch1', 'voltage_ch2']
+
+def round_csv(file_path, data, decimal_places): #Layout of the previous save_csv: round() of every value through csv.writer.
+    with open(file_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(HEADER)
+        writer.writerows([round(value, places) for (value, places) in zip(row, decimal_places)] for row in data.tolist())
+
+@pytest.mark.parametrize('decimal_places', [[9, 2, 2], [10, 4, 4], [12, 8, 8]])
+def test_capture_csv_matches_round(tmp_path, decimal_places):
+    rng = np.random.default_rng(0)
+    codes = rng.integers(-128, 128, 20000)
+    data = np.vstack((np.linspace(-2.5e-4, 2.5e-4, 20000, endpoint=False), codes*0.004 + 0.01, rng.normal(0, 1e-4, 20000))).T
+    write_array_csv(tmp_path/'new.csv', data, HEADER, decimal_places)
+    round_csv(tmp_path/'old.csv', data, decimal_places)
+    assert (tmp_path/'new.csv').read_bytes() == (tmp_path/'old.csv').read_bytes()
+
+def test_special_values_match_round(tmp_path):
+    data = np.array([[0.0, -0.0, np.nan], [1e-5, -1e-5, np.inf], [2.675, 0.285, -np.inf], [1e17, -3e20, 12345.5], [0.125, 0.375, -0.00005]])
+    write_array_csv(tmp_path/'new.csv', data, HEADER, [5, 2, 2])
+    round_csv(tmp_path/'old.csv', data, [5, 2, 2])
+    assert (tmp_path/'new.csv').read_bytes() == (tmp_path/'old.csv').read_bytes()
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from periclis_instrumentation_controller.scope_control.spectrum_analysis import analyse_spectrum, magnitude_spectrum, spectrum_window
+from periclis_instrumentation_controller.scope_control.device_specific_commands import ACCEPTED_SPECTRUM_WINDOWS
+
+XINCR = 1e-8 #100 MS/s.
+TIME = np.arange(8192) * XINCR
+FREQUENCY = 1.2345e6 #Between two bins (not coherent with the record).
+NOISE = 1e-3 #V rms.
+
+def distorted_tone(amplitude: float = 1.0): #Tone with the 2nd harmonic at -40 dBc and the 3rd at -50 dBc, plus white noise.
+    tone = amplitude*np.sin(2*np.pi*FREQUENCY*TIME) + amplitude*10**(-40/20)*np.sin(4*np.pi*FREQUENCY*TIME) + amplitude*10**(-50/20)*np.sin(6*np.pi*FREQUENCY*TIME)
+    return tone + np.random.default_rng(0).normal(0, NOISE, TIME.size)
+
+def test_tone_peak_bin_and_amplitude():
+    (frequencies, magnitudes) = magnitude_spectrum(distorted_tone(), XINCR, ACCEPTED_SPECTRUM_WINDOWS.blackmanharris)
+    assert np.argmax(magnitudes) == round(FREQUENCY*TIME.size*XINCR)
+    assert frequencies[np.argmax(magnitudes)] == pytest.approx(FREQUENCY, abs=1/(TIME.size*XINCR))
+
+def test_distortion_and_noise():
+    results = analyse_spectrum(distorted_tone(0.5), XINCR, harmonics=5)
+    assert results['fundamental_frequency'] == pytest.approx(FREQUENCY, rel=1e-3)
+    assert results['fundamental_amplitude'] == pytest.approx(0.5, rel=0.01)
+    assert results['harmonic_2'] == pytest.approx(-40, abs=0.2)
+    assert results['harmonic_3'] == pytest.approx(-50, abs=0.5)
+    assert results['thd'] == pytest.approx(10*np.log10(10**(-40/10) + 10**(-50/10)), abs=0.2)
+    assert results['sfdr'] == pytest.approx(40, abs=1)
+    assert results['snr'] == pytest.approx(10*np.log10(0.5**2/2 / NOISE**2), abs=0.5)
+    assert results['enob'] == pytest.approx((results['sinad'] - 1.76) / 6.02)
+
+def test_batched_segments_and_channels():
+    waves = np.stack([np.stack((distorted_tone(amplitude), distorted_tone(amplitude/2))) for amplitude in (1.0, 0.2)]) #(segments, channels, points).
+    results = analyse_spectrum(waves, XINCR)
+    assert results['fundamental_amplitude'].shape == (2, 2)
+    assert results['fundamental_amplitude'] == pytest.approx(np.array([[1.0, 0.5], [0.2, 0.1]]), rel=0.01)
+    assert results['harmonic_2'] == pytest.approx(np.full((2, 2), -40), abs=0.5)
+
+def test_window_is_cached_read_only():
+    window = spectrum_window(TIME.size, ACCEPTED_SPECTRUM_WINDOWS.hann)
+    assert window is spectrum_window(TIME.size, ACCEPTED_SPECTRUM_WINDOWS.hann)
+    assert not window.flags.writeable
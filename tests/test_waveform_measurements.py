@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from periclis_instrumentation_controller.scope_control.waveform_measurements import measure_waves, measurements_by_channel
+
+XINCR = 1e-9 #1 GS/s.
+TIME = np.arange(20000) * XINCR
+
+def trapezoid_clock(frequency: float, duty: float, edge: float, low: float = 0.0, high: float = 1.0): #Clock with linear rising and falling edges (0 to 100%) of edge seconds.
+    period = 1 / frequency
+    starts = np.arange(-1, TIME[-1]*frequency + 2) * period
+    knots = np.stack((starts, starts + edge, starts + duty*period, starts + duty*period + edge), axis=-1).ravel()
+    return np.interp(TIME, knots, np.tile([low, high, high, low], starts.size))
+
+def test_square_wave():
+    results = measure_waves(trapezoid_clock(1e6, 0.3, 10e-9, -0.5, 1.5), XINCR)
+    assert results['base'] == pytest.approx(-0.5, abs=0.02) #Means of the points below and above the middle (edge points included).
+    assert results['top'] == pytest.approx(1.5, abs=0.02)
+    assert results['vpp'] == pytest.approx(2)
+    assert results['frequency'] == pytest.approx(1e6, rel=1e-6)
+    assert results['duty_cycle'] == pytest.approx(30, abs=0.2)
+    assert results['rise_time'] == pytest.approx(8e-9, rel=0.02) #10% to 90% of a 10 ns linear edge (of the measured base and top).
+    assert results['fall_time'] == pytest.approx(8e-9, rel=0.02)
+    assert results['overshoot'] == pytest.approx(0, abs=1) #%, top lowered by the edge points.
+    assert results['rising_crossings'] == 20
+
+def test_sine_wave():
+    results = measure_waves(0.2 + 0.5*np.sin(2*np.pi*2.5e6*TIME), XINCR)
+    assert results['mean'] == pytest.approx(0.2, abs=1e-6)
+    assert results['rms'] == pytest.approx(np.sqrt(0.2**2 + 0.5**2/2), rel=1e-6)
+    assert results['vpp'] == pytest.approx(1, abs=1e-3)
+    assert results['frequency'] == pytest.approx(2.5e6, rel=1e-6)
+    assert results['duty_cycle'] == pytest.approx(50, abs=0.5) #Points high (1 point: 0.25% of the period).
+
+def test_stack_of_captures_gives_one_value_per_segment_and_channel():
+    waves = np.stack([np.stack((trapezoid_clock(frequency, 0.5, 5e-9), np.full(TIME.size, 0.25))) for frequency in (1e6, 2e6, 4e6)]) #(segments, channels, points).
+    results = measure_waves(waves, XINCR)
+    assert results['frequency'].shape == (3, 2)
+    assert results['frequency'][:, 0] == pytest.approx([1e6, 2e6, 4e6], rel=1e-6)
+    assert np.isnan(results['frequency'][:, 1]).all() #DC channel: no period.
+    by_channel = measurements_by_channel(results, [1, 3])
+    assert by_channel['CH3']['mean'] == pytest.approx([0.25]*3)